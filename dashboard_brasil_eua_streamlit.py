@@ -23,17 +23,17 @@ import pandas as pd
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import numpy as np
-from datetime import datetime, timedelta
+from datetime import datetime
 import requests
 import os
+import logging
+from concurrent.futures import ThreadPoolExecutor
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
 
-# Tentativa de importar statsmodels (pode não estar disponível)
-try:
-    from statsmodels.tsa.seasonal import seasonal_decompose
-    HAS_STATSMODELS = True
-except ImportError:
-    HAS_STATSMODELS = False
-    st.warning("⚠️ statsmodels não disponível. Ajuste sazonal simplificado será usado.")
+# Mensagens de progresso do carregamento (silenciosas no nível padrão WARNING)
+logger = logging.getLogger(__name__)
 
 # =============================================================================
 # CONFIGURAÇÃO DA PÁGINA
@@ -50,73 +50,273 @@ st.set_page_config(
 # FUNÇÕES DE CARREGAMENTO E PROCESSAMENTO DE DADOS
 # =============================================================================
 
-@st.cache_data
+# URLs dos arquivos no GitHub Release
+RELEASE_BASE_URL = "https://github.com/ealmeida11/dashboard-brasil-eua/releases/download/v1.0.0/"
+EXPORT_FILE = 'dados_brasil_eua_exportacao.csv'
+IMPORT_FILE = 'dados_brasil_eua_importacao.csv'
+
+# Colunas efetivamente utilizadas pelo dashboard (as demais não entram no Parquet nem são lidas)
+EXPORT_COLUMNS = ['Data', 'VL_FOB', 'Produto', 'CO_NCM']
+IMPORT_COLUMNS = ['Data', 'VL_FOB', 'Produto']
+
+def _parquet_name(csv_path):
+    """Caminho do artefato Parquet correspondente a um CSV de dados"""
+    return os.path.splitext(csv_path)[0] + '.parquet'
+
+def _download_raw(url, path):
+    """
+    Baixa um arquivo do GitHub Release para o disco local
+    
+    O corpo da resposta é gravado em blocos de 1 MB conforme chega, sem
+    manter o arquivo inteiro em memória. O download vai para um arquivo
+    temporário e só é renomeado ao final, para nunca deixar um CSV truncado.
+    
+    Returns:
+        str: Caminho do arquivo baixado
+    """
+    tmp_path = path + '.part'
+    with requests.get(url, stream=True, timeout=30) as response:
+        response.raise_for_status()
+        with open(tmp_path, 'wb') as f:
+            for chunk in response.iter_content(chunk_size=1 << 20):
+                f.write(chunk)
+    os.replace(tmp_path, path)
+    return path
+
+@st.cache_resource(show_spinner=False)
+def _download_release_files():
+    """
+    Baixa do GitHub Release os CSVs que ainda não existem localmente
+    
+    Os dois downloads são independentes e rodam em paralelo. Cacheado com
+    st.cache_resource: acontece no máximo uma vez por container.
+    
+    Returns:
+        tuple: (caminho do CSV de exportação, caminho do CSV de importação)
+    """
+    missing = [
+        csv_file for csv_file in (EXPORT_FILE, IMPORT_FILE)
+        if not os.path.exists(_parquet_name(csv_file)) and not os.path.exists(csv_file)
+    ]
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        # list() propaga para cá qualquer erro ocorrido nas threads
+        list(executor.map(lambda csv_file: _download_raw(RELEASE_BASE_URL + csv_file, csv_file), missing))
+    return EXPORT_FILE, IMPORT_FILE
+
+def _to_parquet(csv_path, columns):
+    """
+    Converte um CSV de dados para Parquet (zstd), apenas na primeira execução
+    
+    O Parquet guarda a coluna Data já como timestamp nativo, evitando o
+    parse de texto -> datetime a cada cold start.
+    
+    Args:
+        csv_path (str): CSV de dados
+        columns (list): Colunas lidas do CSV e gravadas no Parquet
+        
+    Returns:
+        str: Caminho do arquivo Parquet
+    """
+    parquet_path = _parquet_name(csv_path)
+    # Reaproveita o Parquet, a menos que o CSV tenha sido regerado depois dele
+    if os.path.exists(parquet_path) and (
+        not os.path.exists(csv_path) or os.path.getmtime(parquet_path) >= os.path.getmtime(csv_path)
+    ):
+        return parquet_path
+    
+    logger.debug("🗜️ Convertendo %s para Parquet...", csv_path)
+    # Leitor CSV multi-thread do Arrow; só as colunas do dashboard são materializadas,
+    # Data já sai como timestamp e a tabela vai direto para o Parquet
+    data = pa_csv.read_csv(
+        csv_path,
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=columns,
+            column_types={'Data': pa.timestamp('ns'), 'VL_FOB': pa.float64()}
+        )
+    )
+    
+    # Escrita em arquivo temporário para nunca deixar um Parquet incompleto no disco
+    tmp_path = parquet_path + '.tmp'
+    pq.write_table(data, tmp_path, compression='zstd')
+    os.replace(tmp_path, parquet_path)
+    return parquet_path
+
+@st.cache_data(persist="disk", max_entries=2, show_spinner=False)
+def _read_data(export_path, import_path, data_version):
+    """
+    Lê os Parquets e aplica os tipos usados pelo dashboard
+    
+    Persistido em disco: após um restart do container o resultado volta do
+    cache sem reler os arquivos. data_version (datas de modificação dos
+    Parquets) entra na chave, então dados novos invalidam o cache.
+    
+    Args:
+        export_path (str): Parquet de exportação
+        import_path (str): Parquet de importação
+        data_version (tuple): Versão dos arquivos (chave do cache)
+        
+    Returns:
+        tuple: (export_data, import_data)
+    """
+    # Leitura colunar do Parquet (Data já vem como datetime)
+    export_data = pd.read_parquet(export_path, columns=EXPORT_COLUMNS)
+    import_data = pd.read_parquet(import_path, columns=IMPORT_COLUMNS)
+    
+    # VL_FOB em float32: metade da memória (e do hash) carregada entre reruns
+    export_data['VL_FOB'] = export_data['VL_FOB'].astype(np.float32)
+    import_data['VL_FOB'] = import_data['VL_FOB'].astype(np.float32)
+    
+    # Produto como categoria: groupby e filtros operam sobre códigos inteiros
+    export_data['Produto'] = export_data['Produto'].astype('category')
+    import_data['Produto'] = import_data['Produto'].astype('category')
+    
+    # CO_NCM (8 dígitos) cabe em int32: metade da memória do int64
+    export_data['CO_NCM'] = pd.to_numeric(export_data['CO_NCM'], downcast='integer')
+    
+    # Exportações ordenadas por data: os filtros de período viram busca binária + fatia
+    if not export_data['Data'].is_monotonic_increasing:
+        export_data = export_data.sort_values('Data', kind='stable', ignore_index=True)
+    
+    return export_data, import_data
+
 def load_data():
     """
     Carrega e processa os dados de exportação e importação Brasil-EUA
     
+    Os CSVs (locais ou baixados do GitHub Release) são convertidos uma única
+    vez para Parquet; a leitura tipada fica em _read_data, cacheada em disco.
+    
     Returns:
-        tuple: (export_data, import_data) ou (None, None) em caso de erro
+        tuple: (export_data, import_data, data_source), com data_source =
+        (export_path, import_path, data_version); (None, None, None) em caso de erro
     """
     try:
-        print("📊 Carregando dados de exportação e importação...")
+        logger.debug("📊 Carregando dados de exportação e importação...")
         
-        # Carregando arquivos CSV processados anteriormente
-        export_data = pd.read_csv('dados_brasil_eua_exportacao.csv')
-        import_data = pd.read_csv('dados_brasil_eua_importacao.csv')
+        # Download silencioso dos dados do GitHub Release (apenas se não existirem localmente)
+        try:
+            _download_release_files()
+        except Exception as download_error:
+            st.error(f"❌ Erro ao baixar dados do GitHub: {download_error}")
+            st.error("💡 Verifique se os arquivos estão disponíveis no GitHub Release v1.0.0")
+            return None, None, None
         
-        print(f"✅ Dados carregados: {len(export_data):,} exportações, {len(import_data):,} importações")
+        export_path = _to_parquet(EXPORT_FILE, EXPORT_COLUMNS)
+        import_path = _to_parquet(IMPORT_FILE, IMPORT_COLUMNS)
+        data_version = (os.path.getmtime(export_path), os.path.getmtime(import_path))
+        export_data, import_data = _read_data(export_path, import_path, data_version)
         
-        # Convertendo colunas de data para datetime
-        export_data['Data'] = pd.to_datetime(export_data['Data'])
-        import_data['Data'] = pd.to_datetime(import_data['Data'])
+        logger.debug("✅ Dados carregados: %d exportações, %d importações", len(export_data), len(import_data))
         
         # Verificação básica dos dados
         if export_data.empty or import_data.empty:
             st.error("❌ Dados vazios encontrados!")
-            return None, None
-            
-        return export_data, import_data
+            return None, None, None
         
-    except FileNotFoundError as e:
-        # Download silencioso dos dados do GitHub Release
+        # Caminhos e versão devolvidos junto: a página reusa a mesma chave nos caches
+        return export_data, import_data, (export_path, import_path, data_version)
         
-        # URLs dos arquivos no GitHub Release
-        release_base_url = "https://github.com/ealmeida11/dashboard-brasil-eua/releases/download/v1.0.0/"
-        export_file = 'dados_brasil_eua_exportacao.csv'
-        import_file = 'dados_brasil_eua_importacao.csv'
-        
-        try:
-            # Baixa dados de exportação (silenciosamente)
-            response = requests.get(release_base_url + export_file)
-            with open(export_file, 'wb') as f:
-                f.write(response.content)
-            
-            # Baixa dados de importação (silenciosamente)
-            response = requests.get(release_base_url + import_file)
-            with open(import_file, 'wb') as f:
-                f.write(response.content)
-            
-            # Tenta carregar novamente
-            export_data = pd.read_csv(export_file)
-            import_data = pd.read_csv(import_file)
-            
-            # Convertendo colunas de data para datetime
-            export_data['Data'] = pd.to_datetime(export_data['Data'])
-            import_data['Data'] = pd.to_datetime(import_data['Data'])
-            
-            return export_data, import_data
-            
-        except Exception as download_error:
-            st.error(f"❌ Erro ao baixar dados do GitHub: {download_error}")
-            st.error("💡 Verifique se os arquivos estão disponíveis no GitHub Release v1.0.0")
-            return None, None
     except Exception as e:
         st.error(f"❌ Erro ao carregar dados: {e}")
-        return None, None
+        return None, None, None
 
-@st.cache_data
-def create_monthly_aggregation(export_data, import_data):
+def _rolling_sum_min1(x, window):
+    """
+    Soma móvel equivalente a rolling(window, min_periods=1).sum()
+    
+    Usa soma acumulada (prefix sum): cada janela é cs[i] - cs[i - window],
+    em O(n) independentemente do tamanho da janela. As primeiras posições
+    somam janelas parciais, como no min_periods=1 do pandas. O acumulado é
+    feito em float64 para não perder precisão na subtração. Aceita matriz
+    (n, k): cada coluna é uma série, processadas juntas em uma passada.
+    """
+    cs = np.cumsum(x, axis=0, dtype=np.float64)
+    out = cs.copy()
+    out[window:] -= cs[:-window]
+    return out.astype(x.dtype, copy=False)
+
+def _rolling_mean_min1(x, window):
+    """Média móvel equivalente a rolling(window, min_periods=1).mean()"""
+    counts = np.minimum(np.arange(1, len(x) + 1), window).astype(x.dtype)
+    if x.ndim == 2:
+        counts = counts[:, None]
+    return _rolling_sum_min1(x, window) / counts
+
+def _fill_nan_linear(x):
+    """
+    Preenche NaN como interpolate(method='linear').bfill().ffill(), em uma passada
+    
+    np.interp interpola os buracos internos e repete o primeiro/último valor
+    válido nas pontas.
+    """
+    x = np.asarray(x)
+    nan_mask = np.isnan(x)
+    if not nan_mask.any() or nan_mask.all():
+        return x
+    idx = np.arange(len(x))
+    out = x.copy()
+    out[nan_mask] = np.interp(idx[nan_mask], idx[~nan_mask], x[~nan_mask])
+    return out
+
+def _seasonal_adjust(x, period=12):
+    """
+    Série sem o componente sazonal (trend + resid), decomposição aditiva em NumPy
+    
+    Reproduz seasonal_decompose(model='additive', extrapolate_trend='freq')
+    do statsmodels: tendência por média móvel centrada (2x12 para período par),
+    pontas extrapoladas por reta de mínimos quadrados sobre os period pontos
+    mais próximos, e sazonalidade como a média de cada fase do período (centrada em zero).
+    Aceita matriz (n, k): cada coluna é decomposta de forma independente.
+    
+    Args:
+        x (ndarray): Série(s) mensal(is) sem NaN, com pelo menos 2 períodos
+        period (int): Período sazonal
+        
+    Returns:
+        ndarray: x - sazonalidade, em float64
+    """
+    x = np.asarray(x, dtype=np.float64)
+    n = len(x)
+    
+    # Tendência: média móvel centrada (pesos 0.5 nas pontas quando o período é par)
+    if period % 2 == 0:
+        filt = np.r_[0.5, np.ones(period - 1), 0.5] / period
+    else:
+        filt = np.ones(period) / period
+    half = len(filt) // 2
+    cs = np.cumsum(np.concatenate([np.zeros((1,) + x.shape[1:]), x]), axis=0)
+    trend = np.empty_like(x)
+    window = len(filt)
+    inner = cs[window:] - cs[:-window]
+    if period % 2 == 0:
+        # Janela de period + 1 pontos com meio peso nas duas pontas
+        inner = inner - 0.5 * (x[:n - window + 1] + x[window - 1:])
+    trend[half:n - half] = inner / period
+    
+    # Pontas da tendência extrapoladas por reta ajustada nos period pontos mais próximos
+    npoints = period
+    front, back = half, n - 1 - half
+    front_last = min(front + npoints, back)
+    coef = np.linalg.lstsq(
+        np.c_[np.arange(front, front_last), np.ones(front_last - front)],
+        trend[front:front_last], rcond=-1
+    )[0]
+    trend[:front] = np.c_[np.arange(front), np.ones(front)] @ coef
+    back_first = max(front, back - npoints)
+    coef = np.linalg.lstsq(
+        np.c_[np.arange(back_first, back), np.ones(back - back_first)],
+        trend[back_first:back], rcond=-1
+    )[0]
+    trend[back + 1:] = np.c_[np.arange(back + 1, n), np.ones(n - back - 1)] @ coef
+    
+    # Sazonalidade: média de cada fase do período, centrada em zero
+    detrended = x - trend
+    period_averages = np.array([detrended[i::period].mean(axis=0) for i in range(period)])
+    period_averages -= period_averages.mean(axis=0)
+    return x - period_averages[np.arange(n) % period]
+
+@st.cache_data(persist="disk", max_entries=4)
+def create_monthly_aggregation(export_path, import_path, data_version):
     """
     Cria agregação mensal dos dados de comércio bilateral
     
@@ -126,34 +326,41 @@ def create_monthly_aggregation(export_data, import_data):
     - Sazonalmente ajustado anualizado  
     - Média móvel 3 meses sazonalmente ajustada
     
+    O resultado é persistido em disco (sobrevive a restarts do container).
+    A chave do cache são os caminhos dos Parquets e suas datas de modificação,
+    então o hash é O(1) em vez de percorrer as linhas dos DataFrames.
+    
     Args:
-        export_data (DataFrame): Dados de exportação
-        import_data (DataFrame): Dados de importação
+        export_path (str): Arquivo Parquet de exportação
+        import_path (str): Arquivo Parquet de importação
+        data_version (tuple): Datas de modificação dos arquivos (invalida o cache quando os dados mudam)
         
     Returns:
         DataFrame: Dados mensais agregados com todas as métricas
     """
-    print("📅 Criando agregação mensal...")
+    logger.debug("📅 Criando agregação mensal...")
+    
+    # Apenas as colunas necessárias para a agregação mensal
+    export_data = pd.read_parquet(export_path, columns=['Data', 'VL_FOB'])
+    import_data = pd.read_parquet(import_path, columns=['Data', 'VL_FOB'])
     
     # =============================================================================
     # 1. AGREGAÇÃO MENSAL BÁSICA
     # =============================================================================
     
-    # Agregação mensal exportações (valor em FOB)
-    exp_monthly = export_data.groupby('Data')['VL_FOB'].sum().reset_index()
-    exp_monthly.columns = ['Data', 'Exportacoes']
-    # Convertendo para milhões de USD (40.838 = 40 bilhões e 838 milhões)
-    exp_monthly['Exportacoes'] = exp_monthly['Exportacoes'] / 1000000
+    # Agregação mensal exportações e importações (valor em FOB)
+    exp_monthly = export_data.groupby('Data')['VL_FOB'].sum()
+    imp_monthly = import_data.groupby('Data')['VL_FOB'].sum()
     
-    # Agregação mensal importações (valor em FOB)
-    imp_monthly = import_data.groupby('Data')['VL_FOB'].sum().reset_index()
-    imp_monthly.columns = ['Data', 'Importacoes']
-    # Convertendo para milhões de USD (42.246 = 42 bilhões e 246 milhões)
-    imp_monthly['Importacoes'] = imp_monthly['Importacoes'] / 1000000
+    # Alinhando os dois índices mensais (união ordenada, meses ausentes = 0)
+    exp_monthly, imp_monthly = exp_monthly.align(imp_monthly, join='outer', fill_value=0.0)
     
-    # Merge dos dados mensais
-    trade_monthly = pd.merge(exp_monthly, imp_monthly, on='Data', how='outer').fillna(0)
-    trade_monthly = trade_monthly.sort_values('Data')
+    # Convertendo para milhões de USD (40.838 = 40 bilhões e 838 milhões)
+    trade_monthly = pd.DataFrame({
+        'Data': exp_monthly.index,
+        'Exportacoes': exp_monthly.to_numpy(dtype=np.float32) / np.float32(1e6),
+        'Importacoes': imp_monthly.to_numpy(dtype=np.float32) / np.float32(1e6),
+    })
     
     # =============================================================================
     # 2. CÁLCULO DO TRADE BALANCE
@@ -166,50 +373,44 @@ def create_monthly_aggregation(export_data, import_data):
     # 3. ACUMULADO 12 MESES (ROLLING SUM)
     # =============================================================================
     
-    trade_monthly['Exp_12M'] = trade_monthly['Exportacoes'].rolling(window=12, min_periods=1).sum()
-    trade_monthly['Imp_12M'] = trade_monthly['Importacoes'].rolling(window=12, min_periods=1).sum()
+    # Buffers contíguos float32 usados pelas janelas móveis e pelo ajuste sazonal
+    exp_arr = trade_monthly['Exportacoes'].to_numpy(dtype=np.float32)
+    imp_arr = trade_monthly['Importacoes'].to_numpy(dtype=np.float32)
+    
+    # Exportações e importações na mesma passada (colunas de uma matriz n x 2)
+    trade_12m = _rolling_sum_min1(np.column_stack((exp_arr, imp_arr)), 12)
+    trade_monthly['Exp_12M'] = trade_12m[:, 0]
+    trade_monthly['Imp_12M'] = trade_12m[:, 1]
     trade_monthly['Balance_12M'] = trade_monthly['Exp_12M'] - trade_monthly['Imp_12M']
     
     # =============================================================================
     # 4. AJUSTE SAZONAL ANUALIZADO
     # =============================================================================
     
-    # Verificando se temos dados suficientes e se statsmodels está disponível
-    if len(trade_monthly) >= 24 and HAS_STATSMODELS:  # Precisamos de pelo menos 2 anos
+    # Verificando se temos dados suficientes
+    if len(trade_monthly) >= 24:  # Precisamos de pelo menos 2 anos
         try:
-            print("🔄 Aplicando ajuste sazonal com statsmodels...")
+            logger.debug("🔄 Aplicando ajuste sazonal...")
+            
+            # Exportações e importações decompostas juntas (colunas de uma matriz n x 2)
+            trade_arr = np.column_stack((exp_arr, imp_arr))
+            trade_arr = np.where(np.isnan(trade_arr), np.nanmean(trade_arr, axis=0), trade_arr)
             
-            # Ajuste sazonal para exportações
-            exp_decomp = seasonal_decompose(
-                trade_monthly['Exportacoes'].fillna(trade_monthly['Exportacoes'].mean()), 
-                model='additive', 
-                period=12,
-                extrapolate_trend='freq'  # Extrapola trend para evitar NaN
-            )
             # Trend + Residual (removendo sazonalidade) * 12 (anualizando)
             # Preenchendo NaN com valores interpolados
-            exp_sa = (exp_decomp.trend + exp_decomp.resid) * 12
-            trade_monthly['Exp_SA'] = exp_sa.interpolate(method='linear').bfill().ffill()
-            
-            # Ajuste sazonal para importações
-            imp_decomp = seasonal_decompose(
-                trade_monthly['Importacoes'].fillna(trade_monthly['Importacoes'].mean()), 
-                model='additive', 
-                period=12,
-                extrapolate_trend='freq'  # Extrapola trend para evitar NaN
-            )
-            imp_sa = (imp_decomp.trend + imp_decomp.resid) * 12
-            trade_monthly['Imp_SA'] = imp_sa.interpolate(method='linear').bfill().ffill()
+            trade_sa = _seasonal_adjust(trade_arr, period=12) * 12
+            trade_monthly['Exp_SA'] = _fill_nan_linear(trade_sa[:, 0])
+            trade_monthly['Imp_SA'] = _fill_nan_linear(trade_sa[:, 1])
             
-            print("✅ Ajuste sazonal aplicado com interpolação!")
+            logger.debug("✅ Ajuste sazonal aplicado com interpolação!")
             
         except Exception as e:
-            print(f"⚠️ Erro no ajuste sazonal: {e}. Usando fallback...")
+            logger.warning("⚠️ Erro no ajuste sazonal: %s. Usando fallback...", e)
             # Fallback: simples anualização sem ajuste sazonal
             trade_monthly['Exp_SA'] = trade_monthly['Exportacoes'] * 12
             trade_monthly['Imp_SA'] = trade_monthly['Importacoes'] * 12
     else:
-        print("⚠️ Dados insuficientes ou statsmodels indisponível. Usando anualização simples...")
+        logger.warning("⚠️ Dados insuficientes. Usando anualização simples...")
         # Fallback: simples anualização sem ajuste sazonal
         trade_monthly['Exp_SA'] = trade_monthly['Exportacoes'] * 12
         trade_monthly['Imp_SA'] = trade_monthly['Importacoes'] * 12
@@ -221,19 +422,161 @@ def create_monthly_aggregation(export_data, import_data):
     # 5. MÉDIA MÓVEL 3 MESES SAZONALMENTE AJUSTADA ANUALIZADA
     # =============================================================================
     
-    trade_monthly['Exp_3MMA_SA'] = trade_monthly['Exp_SA'].rolling(window=3, min_periods=1).mean()
-    trade_monthly['Imp_3MMA_SA'] = trade_monthly['Imp_SA'].rolling(window=3, min_periods=1).mean()
+    trade_3mma = _rolling_mean_min1(trade_monthly[['Exp_SA', 'Imp_SA']].to_numpy(dtype=np.float32), 3)
+    trade_monthly['Exp_3MMA_SA'] = trade_3mma[:, 0]
+    trade_monthly['Imp_3MMA_SA'] = trade_3mma[:, 1]
     trade_monthly['Balance_3MMA_SA'] = trade_monthly['Exp_3MMA_SA'] - trade_monthly['Imp_3MMA_SA']
     
-    print(f"✅ Agregação mensal concluída: {len(trade_monthly)} períodos processados")
+    logger.debug("✅ Agregação mensal concluída: %d períodos processados", len(trade_monthly))
     
     return trade_monthly
 
+@st.cache_data(show_spinner=False)
+def unique_products(data_version, _export_data, _import_data):
+    """
+    Lista ordenada de produtos presentes na exportação ou na importação
+    
+    Produto é categórico: as categorias já são os valores únicos de cada base,
+    então basta unir os dois dicionários (sem varrer as linhas).
+    
+    Args:
+        data_version (tuple): Versão dos arquivos (chave do cache)
+        _export_data (DataFrame): Dados de exportação (fora do hash)
+        _import_data (DataFrame): Dados de importação (fora do hash)
+        
+    Returns:
+        list: Nomes dos produtos em ordem alfabética
+    """
+    categories = _export_data['Produto'].cat.categories.union(_import_data['Produto'].cat.categories)
+    return sorted(categories.tolist())
+
+@st.cache_data(show_spinner=False)
+def product_monthly(data_version, _export_data, _import_data):
+    """
+    Valor mensal por produto, para exportação e importação
+    
+    Um único groupby (Produto, Data) por base, reaproveitado entre reruns;
+    a análise por produto só faz o lookup do produto selecionado.
+    
+    Args:
+        data_version (tuple): Versão dos arquivos (chave do cache)
+        _export_data (DataFrame): Dados de exportação
+        _import_data (DataFrame): Dados de importação
+        
+    Returns:
+        dict: Tipo de comércio -> Series VL_FOB com MultiIndex (Produto, Data)
+    """
+    return {
+        'Exportação': _export_data.groupby(['Produto', 'Data'], observed=True)['VL_FOB'].sum(),
+        'Importação': _import_data.groupby(['Produto', 'Data'], observed=True)['VL_FOB'].sum(),
+    }
+
+@st.cache_data(show_spinner=False)
+def compute_product_sa(values, period=12):
+    """
+    Série mensal sazonalmente ajustada e anualizada de um produto
+    
+    Cacheada pelo conteúdo da série: trocar de produto e voltar não refaz
+    a decomposição.
+    
+    Args:
+        values (ndarray): Valores mensais em US$ Bi, em ordem cronológica
+        period (int): Período sazonal (12 meses)
+        
+    Returns:
+        ndarray: Série SA anualizada (sem ajuste quando não há histórico suficiente)
+    """
+    if len(values) >= 2 * period:
+        try:
+            filled = np.where(np.isnan(values), np.nanmean(values), values)
+            return _fill_nan_linear(_seasonal_adjust(filled, period=period) * 12)
+        except (ValueError, np.linalg.LinAlgError) as e:
+            logger.warning("⚠️ Erro no ajuste sazonal do produto: %s. Usando anualização simples...", e)
+    return values * 12
+
+@st.cache_data(show_spinner=False)
+def product_series_views(data_version, _export_data, _import_data, trade_type, product):
+    """
+    Séries de visualização de um produto: valor mensal, 12M, SA e 3MMA SA
+    
+    Cacheada por (trade_type, product): trocar apenas o tipo de visualização
+    reaproveita as três séries já calculadas.
+    
+    Args:
+        data_version (tuple): Versão dos arquivos (chave do cache)
+        _export_data (DataFrame): Dados de exportação
+        _import_data (DataFrame): Dados de importação
+        trade_type (str): 'Exportação' ou 'Importação'
+        product (str): Nome do produto
+        
+    Returns:
+        DataFrame | None: Data, VL_FOB_BI, Value_12M, Value_SA e Value_3MMA_SA
+        (US$ Bi), ou None se o produto não tem dados no tipo de comércio
+    """
+    # Lookup na agregação cacheada; o groupby já entrega as datas em ordem
+    try:
+        product_series = product_monthly(data_version, _export_data, _import_data)[trade_type].loc[product]
+    except KeyError:
+        return None
+    if len(product_series) == 0:
+        return None
+    
+    # Convertendo para bilhões de USD
+    vl_bi = product_series.to_numpy(dtype=np.float32) / np.float32(1e9)
+    value_sa = compute_product_sa(vl_bi)
+    return pd.DataFrame({
+        'Data': product_series.index,
+        'VL_FOB_BI': vl_bi,
+        'Value_12M': _rolling_sum_min1(vl_bi, 12),
+        'Value_SA': value_sa,
+        'Value_3MMA_SA': _rolling_mean_min1(value_sa, 3),
+    })
+
 # =============================================================================
 # FUNÇÕES DE VISUALIZAÇÃO
 # =============================================================================
 
-def create_trade_chart(trade_monthly, view_type):
+# Máximo de pontos por série enviados ao navegador (acima disso aplica-se LTTB)
+MAX_CHART_POINTS = 2000
+
+def _lttb_indices(x, y, n_out):
+    """
+    Índices selecionados pelo downsampling LTTB (Largest-Triangle-Three-Buckets)
+    
+    Mantém o primeiro e o último ponto e, em cada bucket intermediário, o ponto
+    que forma o maior triângulo com o ponto anterior escolhido e a média do
+    próximo bucket — preserva picos e vales da série.
+    
+    Args:
+        x (np.ndarray): Eixo x numérico (ex.: datas em int64)
+        y (np.ndarray): Valores da série
+        n_out (int): Quantidade de pontos desejada
+        
+    Returns:
+        np.ndarray: Índices (ordenados) dos pontos mantidos
+    """
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    
+    x = x.astype(np.float64)
+    y = y.astype(np.float64)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        next_lo, next_hi = (edges[i + 1], edges[i + 2]) if i + 2 < len(edges) else (n - 1, n)
+        avg_x, avg_y = x[next_lo:next_hi].mean(), y[next_lo:next_hi].mean()
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+@st.cache_resource(max_entries=6, show_spinner=False)
+def create_trade_chart(data_key, view_type, _trade_monthly):
     """
     Cria gráfico principal do trade balance com eixos duplos
     
@@ -242,9 +585,13 @@ def create_trade_chart(trade_monthly, view_type):
     - Barras do trade balance no eixo direito
     - Interatividade completa com Plotly
     
+    A Figure é cacheada com st.cache_resource e reaproveitada entre reruns;
+    a chave é (data_key, view_type) e o DataFrame não entra no hash.
+    
     Args:
-        trade_monthly (DataFrame): Dados mensais agregados
+        data_key (tuple): Versão dos dados mensais (datas de modificação dos Parquets)
         view_type (str): Tipo de visualização selecionada
+        _trade_monthly (DataFrame): Dados mensais agregados
         
     Returns:
         plotly.graph_objects.Figure: Gráfico interativo
@@ -271,15 +618,25 @@ def create_trade_chart(trade_monthly, view_type):
     # Criando figura com eixo duplo (corrigido para Streamlit)
     fig = make_subplots(specs=[[{"secondary_y": True}]])
     
+    # Arrays float32 (metade dos bytes por ponto no payload do Plotly)
+    dates = _trade_monthly['Data'].to_numpy()
+    y_exp = _trade_monthly[exp_col].to_numpy(dtype=np.float32)
+    y_imp = _trade_monthly[imp_col].to_numpy(dtype=np.float32)
+    
+    # Séries longas são reduzidas via LTTB antes de ir para o navegador
+    dates_num = dates.astype('datetime64[ns]').astype(np.int64)
+    exp_idx = _lttb_indices(dates_num, y_exp, MAX_CHART_POINTS)
+    imp_idx = _lttb_indices(dates_num, y_imp, MAX_CHART_POINTS)
+    
     # =============================================================================
     # 3. ADICIONANDO LINHAS DE EXPORTAÇÃO E IMPORTAÇÃO (EIXO ESQUERDO)
     # =============================================================================
     
-    # Linha de Exportações (verde escuro)
+    # Linha de Exportações (verde escuro) - Scattergl renderiza via WebGL
     fig.add_trace(
-        go.Scatter(
-            x=trade_monthly['Data'],
-            y=trade_monthly[exp_col],
+        go.Scattergl(
+            x=dates[exp_idx],
+            y=y_exp[exp_idx],
             name='Exportações',
             line=dict(color='#2E8B57', width=3),
             mode='lines',
@@ -290,9 +647,9 @@ def create_trade_chart(trade_monthly, view_type):
     
     # Linha de Importações (vermelho escuro)
     fig.add_trace(
-        go.Scatter(
-            x=trade_monthly['Data'],
-            y=trade_monthly[imp_col],
+        go.Scattergl(
+            x=dates[imp_idx],
+            y=y_imp[imp_idx],
             name='Importações', 
             line=dict(color='#DC143C', width=3),
             mode='lines',
@@ -305,16 +662,29 @@ def create_trade_chart(trade_monthly, view_type):
     # 4. ADICIONANDO BARRAS DO TRADE BALANCE (EIXO DIREITO)
     # =============================================================================
     
+    # Barras não podem ser amostradas: séries muito longas viram médias trimestrais
+    bal_data = _trade_monthly[['Data', bal_col]]
+    if len(bal_data) > MAX_CHART_POINTS:
+        bal_data = bal_data.resample('QS', on='Data').mean().reset_index()
+    
+    y_bal = bal_data[bal_col].to_numpy(dtype=np.float32)
+    
     # Cores condicionais: verde para superávit, vermelho para déficit
-    colors = ['rgba(0, 128, 0, 0.6)' if x >= 0 else 'rgba(255, 0, 0, 0.6)' for x in trade_monthly[bal_col]]
+    # (flag numérico 0/1 + escala de cores, em vez de uma lista de strings por barra)
+    surplus = (y_bal >= 0).astype(np.int8)
     
     fig.add_trace(
         go.Bar(
-            x=trade_monthly['Data'],
-            y=trade_monthly[bal_col],
+            x=bal_data['Data'].to_numpy(),
+            y=y_bal,
             name='Trade Balance',
-            marker_color=colors,
-            marker_line=dict(width=0.5, color='rgba(0,0,0,0.3)'),
+            marker=dict(
+                color=surplus,
+                colorscale=[[0, 'rgba(255, 0, 0, 0.6)'], [1, 'rgba(0, 128, 0, 0.6)']],
+                cmin=0,
+                cmax=1,
+                line=dict(width=0.5, color='rgba(0,0,0,0.3)')
+            ),
             opacity=0.7,
             hovertemplate='<b>Trade Balance</b><br>Data: %{x}<br>Saldo: $%{y:.1f}Mi<extra></extra>'
         ),
@@ -373,239 +743,337 @@ def create_trade_chart(trade_monthly, view_type):
     
     return fig
 
-def create_product_table(export_data):
+@st.cache_data
+def _ranked_products(data_version, _export_data):
     """
-    Cria tabela dos principais produtos exportados (Top 10 + Outros)
+    Ranking dos produtos pelo valor exportado nos últimos 12 meses
     
-    Calcula:
-    - Valor exportado nos últimos 12 meses por produto
-    - Participação percentual de cada produto
-    - Agrupamento "Outros" para produtos fora do Top 10
+    Único ponto onde o filtro + groupby + ordenação sobre a base completa são
+    executados; create_product_table e create_top100_for_simulator apenas
+    fatiam o resultado.
     
     Args:
-        export_data (DataFrame): Dados de exportação
+        data_version (tuple): Versão dos arquivos (chave do cache)
+        _export_data (DataFrame): Dados de exportação
         
     Returns:
-        DataFrame: Tabela formatada com Top 10 + Outros
+        tuple: (DataFrame com Produto e VL_FOB_MI em ordem decrescente, total exportado em US$ Mi)
     """
-    print("📦 Criando tabela de produtos...")
+    latest_date = _export_data['Data'].max()
+    # Janela de 12 meses de calendário (timedelta de 365 dias escorrega em anos bissextos)
+    cutoff = np.datetime64(latest_date - pd.DateOffset(months=12))
     
-    # =============================================================================
-    # 1. FILTRO DOS ÚLTIMOS 12 MESES
-    # =============================================================================
+    # Data já vem ordenada de load_data: busca binária e fatia, sem máscara booleana
+    start = _export_data['Data'].to_numpy().searchsorted(cutoff, side='right')
+    last_12m = _export_data.iloc[start:]
     
-    latest_date = export_data['Data'].max()
-    last_12m = export_data[export_data['Data'] > (latest_date - timedelta(days=365))]
+    logger.debug("📅 Período analisado: últimos 12 meses até %s", latest_date.strftime('%Y-%m'))
     
-    print(f"📅 Período analisado: últimos 12 meses até {latest_date.strftime('%Y-%m')}")
+    # Somando valor exportado por produto e convertendo para milhões de USD
+    product_agg = last_12m.groupby('Produto', observed=True)['VL_FOB'].sum().reset_index()
+    product_agg['Produto'] = product_agg['Produto'].astype(object)  # permite anexar "Outros"
+    product_agg['VL_FOB_MI'] = product_agg['VL_FOB'] / 1000000
+    ranked = product_agg[['Produto', 'VL_FOB_MI']].sort_values('VL_FOB_MI', ascending=False)
     
-    # =============================================================================
-    # 2. AGREGAÇÃO POR PRODUTO
-    # =============================================================================
+    return ranked.reset_index(drop=True), ranked['VL_FOB_MI'].sum()
+
+def _top_n_with_others(ranked, total_export, n):
+    """
+    Monta a tabela Top N + "Outros" a partir do ranking de produtos
     
-    # Somando valor exportado por produto nos últimos 12 meses
-    product_agg = last_12m.groupby('Produto')['VL_FOB'].sum().reset_index()
-    # Convertendo para milhões de USD
-    product_agg['VL_FOB_MI'] = product_agg['VL_FOB'] / 1000000
-    product_agg = product_agg.sort_values('VL_FOB_MI', ascending=False)
+    Args:
+        ranked (DataFrame): Ranking retornado por _ranked_products
+        total_export (float): Total exportado em US$ Mi
+        n (int): Quantidade de produtos individuais na tabela
+        
+    Returns:
+        DataFrame: Produto, VL_FOB_MI e Percentual (Top N + Outros)
+    """
+    top_n = ranked.head(n).copy()
+    top_n['Percentual'] = (top_n['VL_FOB_MI'] / total_export * 100)
     
-    # Total exportado (para cálculo de percentuais)
-    total_export = product_agg['VL_FOB_MI'].sum()
+    # Produtos fora do Top N (total menos o Top N: uma redução só, sobre N linhas)
+    outros_valor = max(total_export - top_n['VL_FOB_MI'].sum(), 0.0)
+    outros_pct = (outros_valor / total_export * 100)
     
-    print(f"💰 Total exportado (12M): US$ {total_export:.1f} milhões")
-    print(f"📊 Número de produtos únicos: {len(product_agg)}")
+    # Linha "Outros" anexada no próprio DataFrame (sem pd.concat)
+    top_n.loc[len(top_n)] = ['Outros', outros_valor, outros_pct]
     
-    # =============================================================================
-    # 3. TOP 10 PRODUTOS (PARA TABELA PRINCIPAL)
-    # =============================================================================
+    return top_n
+
+@st.cache_data(show_spinner=False)
+def create_product_table(data_version, _export_data):
+    """
+    Cria tabela dos principais produtos exportados (Top 10 + Outros)
+    
+    Calcula:
+    - Valor exportado nos últimos 12 meses por produto
+    - Participação percentual de cada produto
+    - Agrupamento "Outros" para produtos fora do Top 10
     
-    top_10 = product_agg.head(10).copy()
-    top_10['Percentual'] = (top_10['VL_FOB_MI'] / total_export * 100)
+    Args:
+        data_version (tuple): Versão dos arquivos (chave do cache)
+        _export_data (DataFrame): Dados de exportação
+        
+    Returns:
+        DataFrame: Tabela formatada com Top 10 + Outros
+    """
+    logger.debug("📦 Criando tabela de produtos...")
     
     # =============================================================================
-    # 4. CATEGORIA "OUTROS" 
+    # 1. RANKING DOS PRODUTOS NOS ÚLTIMOS 12 MESES (CACHEADO)
     # =============================================================================
     
-    # Produtos fora do Top 10
-    outros_valor = product_agg.tail(-10)['VL_FOB_MI'].sum()
-    outros_pct = (outros_valor / total_export * 100)
-    
-    print(f"🔢 Top 10 representam: {(top_10['VL_FOB_MI'].sum()/total_export*100):.1f}% do total")
-    print(f"🔢 'Outros' representam: {outros_pct:.1f}% do total")
+    ranked, total_export = _ranked_products(data_version, _export_data)
     
-    # Criando linha "Outros"
-    outros_row = pd.DataFrame({
-        'Produto': ['Outros'],
-        'VL_FOB_MI': [outros_valor],
-        'Percentual': [outros_pct]
-    })
+    logger.debug("💰 Total exportado (12M): US$ %.1f milhões", total_export)
+    logger.debug("📊 Número de produtos únicos: %d", len(ranked))
     
     # =============================================================================
-    # 5. TABELA FINAL
+    # 2. TOP 10 PRODUTOS + CATEGORIA "OUTROS"
     # =============================================================================
     
-    final_table = pd.concat([top_10, outros_row], ignore_index=True)
+    final_table = _top_n_with_others(ranked, total_export, 10)
     
-    print("✅ Tabela de produtos criada com sucesso!")
+    logger.debug("🔢 Top 10 representam: %.1f%% do total", final_table['Percentual'].iloc[:-1].sum())
+    logger.debug("🔢 'Outros' representam: %.1f%% do total", final_table['Percentual'].iloc[-1])
+    logger.debug("✅ Tabela de produtos criada com sucesso!")
     
     return final_table
 
-def create_top100_for_simulator(export_data):
+@st.cache_data(show_spinner=False)
+def create_top100_for_simulator(data_version, _export_data):
     """Cria tabela Top 100 produtos especificamente para o simulador"""
     
-    # Últimos 12 meses
-    latest_date = export_data['Data'].max()
-    last_12m = export_data[export_data['Data'] > (latest_date - timedelta(days=365))]
-    
-    # Agregando por produto
-    product_agg = last_12m.groupby('Produto')['VL_FOB'].sum().reset_index()
-    product_agg['VL_FOB_MI'] = product_agg['VL_FOB'] / 1000000
-    product_agg = product_agg.sort_values('VL_FOB_MI', ascending=False)
-    
-    # Total exportado
-    total_export = product_agg['VL_FOB_MI'].sum()
+    # Ranking compartilhado com a tabela principal (groupby executado uma única vez)
+    ranked, total_export = _ranked_products(data_version, _export_data)
     
-    # Top 100 produtos
-    top_100 = product_agg.head(100).copy()
-    top_100['Percentual'] = (top_100['VL_FOB_MI'] / total_export * 100)
+    return _top_n_with_others(ranked, total_export, 100)
+
+@st.cache_data(show_spinner=False)
+def _agg_12m(data_version, _export_data):
+    """
+    Exportações dos últimos 12 meses agregadas por NCM
     
-    # Outros (produtos fora do Top 100)
-    outros_valor = product_agg.tail(-100)['VL_FOB_MI'].sum()
-    outros_pct = (outros_valor / total_export * 100)
+    Base comum do resumo do simulador e do gráfico de evolução da tarifa.
     
-    # Adicionando linha "Outros"
-    outros_row = pd.DataFrame({
-        'Produto': ['Outros'],
-        'VL_FOB_MI': [outros_valor],
-        'Percentual': [outros_pct]
-    })
+    Args:
+        data_version (tuple): Versão dos arquivos (chave do cache)
+        _export_data (DataFrame): Dados de exportação (ordenados por Data)
+        
+    Returns:
+        tuple: (DataFrame com CO_NCM, VL_FOB e Produto, total exportado em US$)
+    """
+    dates = _export_data['Data'].to_numpy()
+    start_date = _export_data['Data'].iloc[-1] - pd.DateOffset(months=11)
+    dados_12m = _export_data.iloc[dates.searchsorted(np.datetime64(start_date), side='left'):]
     
-    final_table = pd.concat([top_100, outros_row], ignore_index=True)
+    # Agregar todos os produtos por NCM
+    produtos_12m = dados_12m.groupby('CO_NCM').agg({
+        'VL_FOB': 'sum',
+        'Produto': 'first'
+    }).reset_index()
     
-    return final_table
+    return produtos_12m, produtos_12m['VL_FOB'].sum()
 
-def get_trump_tariff(ncm_code, scenario="trump_final"):
-    """
-    Determina a tarifa baseada na lista do Trump e cenário temporal
-    scenarios: 'pre_trump', 'liberation_day', 'august_1st', 'trump_final'
+# Lista de códigos HS6 com tarifa de 0% (ISENTOS) - Energia, Minerais Críticos, Eletrônicos/TIC
+TRUMP_0_PERCENT_CODES = frozenset({
+    # ENERGIA
+    "270900", "271000", "271011", "271012", "271019", "271020", "271091", "271092", "271099",
+    "271111", "271112", "271113", "271114", "271119", "271121", "271129", "271210", "271220", 
+    "271290", "271311", "271312", "271320", "271390",
+    
+    # MINERAIS E METAIS CRÍTICOS
+    "260300", "260800", "260600", "280530", "282520", "282580", "284690", "284400",
+    
+    # ELETRÔNICOS & TIC
+    "847100", "847330", "848600", "851713", "851762", "852351", "852852", "854110", "854121", 
+    "854129", "854130", "854149", "854210", "854221", "854229", "854230", "854231", "854232", 
+    "854233", "854239", "854290"
+})
+
+# Lista de códigos HS4 com tarifa de 25% (VEÍCULOS) - Seção 232 mantida
+TRUMP_25_PERCENT_CODES = frozenset({
+    # VEÍCULOS COMPLETOS
+    "8703",  # Passageiros
+    "8704",  # SUV/picape/comerciais leves
+    "8702",  # Vans/ônibus
+    
+    # PARTES & ACESSÓRIOS
+    "8708"   # Partes e acessórios para veículos
+})
+
+# Lista de códigos HS6 com tarifa de 10% baseada na proposta do Trump (379 códigos únicos)
+TRUMP_10_PERCENT_CODES = frozenset({
+    "080121", "200830", "200911", "200912", "252510", "260111", "260112", "260900", "270111", "270112",
+    "270119", "270120", "270210", "270220", "270300", "270400", "270500", "270600", "270710", "270720",
+    "270730", "270740", "270750", "270791", "270799", "270810", "270820", "270900", "271012", "271019",
+    "271020", "271091", "271099", "271111", "271112", "271113", "271114", "271119", "271121", "271129",
+    "271210", "271220", "271290", "271311", "271312", "271320", "271390", "271410", "271490", "271500",
+    "271600", "280469", "281520", "281820", "282590", "282739", "290319", "310510", "310520", "310560",
+    "391721", "391722", "391723", "391729", "391731", "391733", "391739", "391740", "392690", "400829",
+    "400912", "400922", "400932", "400942", "401130", "401213", "401220", "401610", "401693", "401699",
+    "401700", "440729", "450490", "470200", "470311", "470319", "470321", "470329", "470411", "470419",
+    "470421", "470429", "470500", "470610", "470620", "470630", "470691", "470692", "470693", "482390",
+    "560721", "680299", "681280", "681299", "681320", "681381", "681389", "700721", "710691", "710812",
+    "720110", "720120", "720150", "720260", "720293", "720310", "720390", "730431", "730439", "730441",
+    "730449", "730451", "730459", "730490", "730630", "730640", "730650", "730661", "730669", "731210",
+    "731290", "732290", "732410", "732490", "732620", "741300", "760810", "760820", "800200", "810890",
+    "830210", "830220", "830242", "830249", "830260", "830710", "830790", "840710", "840890", "840910",
+    "841111", "841112", "841121", "841122", "841181", "841182", "841191", "841199", "841210", "841221",
+    "841229", "841231", "841239", "841280", "841290", "841319", "841320", "841330", "841350", "841360",
+    "841370", "841381", "841391", "841410", "841420", "841430", "841451", "841459", "841480", "841490",
+    "841510", "841581", "841582", "841583", "841590", "841810", "841830", "841840", "841861", "841869",
+    "841950", "841981", "841990", "842119", "842121", "842123", "842129", "842131", "842132", "842139",
+    "842410", "842511", "842519", "842531", "842539", "842542", "842549", "842699", "842810", "842820",
+    "842833", "842839", "842890", "844331", "844332", "847141", "847149", "847150", "847160", "847170",
+    "847989", "847990", "848310", "848330", "848340", "848350", "848360", "848390", "848410", "848490",
+    "850120", "850131", "850132", "850133", "850134", "850140", "850151", "850152", "850153", "850161",
+    "850162", "850163", "850171", "850172", "850180", "850211", "850212", "850213", "850220", "850231",
+    "850239", "850240", "850410", "850431", "850432", "850433", "850440", "850450", "850710", "850720",
+    "850730", "850750", "850760", "850780", "850790", "851110", "851120", "851130", "851140", "851150",
+    "851180", "851420", "851680", "851713", "851714", "851761", "851762", "851769", "851771", "851810",
+    "851821", "851822", "851829", "851830", "851840", "851850", "851981", "851989", "852110", "852290",
+    "852610", "852691", "852692", "852842", "852852", "852862", "852910", "852990", "853110", "853120",
+    "853180", "853670", "853910", "853951", "854370", "854390", "854430", "880100", "880211", "880212",
+    "880220", "880230", "880240", "880529", "880610", "880621", "880622", "880623", "880624", "880629",
+    "880691", "880692", "880693", "880694", "880699", "880710", "880720", "880730", "880790", "900190",
+    "900290", "901410", "901420", "901490", "902000", "902511", "902519", "902580", "902590", "902610",
+    "902620", "902680", "902690", "902910", "902920", "902990", "903010", "903020", "903031", "903032",
+    "903033", "903039", "903040", "903084", "903089", "903090", "903180", "903190", "903210", "903220",
+    "940511", "940519", "940561", "940569", "940592", "940599", "962000", "980200", "981800"
+})
+
+# Versões inteiras das listas: com o NCM de 8 dígitos como inteiro,
+# HS6 = NCM // 100 e HS4 = NCM // 10000 (preserva zeros à esquerda, ex.: 0801)
+# (arrays montados uma única vez, prontos para o np.isin de build_tariff_table)
+TRUMP_0_PERCENT_HS6 = np.array(sorted(int(code) for code in TRUMP_0_PERCENT_CODES), dtype=np.int64)
+TRUMP_25_PERCENT_HS4 = np.array(sorted(int(code) for code in TRUMP_25_PERCENT_CODES), dtype=np.int64)
+TRUMP_10_PERCENT_HS6 = np.array(sorted(int(code) for code in TRUMP_10_PERCENT_CODES), dtype=np.int64)
+
+@st.cache_data(show_spinner=False)
+def build_tariff_table(ncm_series, scenario="trump_final"):
     """
-    # Cenários por data
-    if scenario == "pre_trump":
-        return 2.0  # Tarifa geral pré-Trump
-    
-    # Lista de códigos HS6 com tarifa de 0% (ISENTOS) - Energia, Minerais Críticos, Eletrônicos/TIC
-    trump_0_percent_codes = {
-        # ENERGIA
-        "270900", "271000", "271011", "271012", "271019", "271020", "271091", "271092", "271099",
-        "271111", "271112", "271113", "271114", "271119", "271121", "271129", "271210", "271220", 
-        "271290", "271311", "271312", "271320", "271390",
-        
-        # MINERAIS E METAIS CRÍTICOS
-        "260300", "260800", "260600", "280530", "282520", "282580", "284690", "284400",
-        
-        # ELETRÔNICOS & TIC
-        "847100", "847330", "848600", "851713", "851762", "852351", "852852", "854110", "854121", 
-        "854129", "854130", "854149", "854210", "854221", "854229", "854230", "854231", "854232", 
-        "854233", "854239", "854290"
-    }
+    Determina a tarifa de cada NCM pela lista do Trump e pelo cenário temporal
     
-    # Lista de códigos HS4 com tarifa de 25% (VEÍCULOS) - Seção 232 mantida
-    trump_25_percent_codes = {
-        # VEÍCULOS COMPLETOS
-        "8703",  # Passageiros
-        "8704",  # SUV/picape/comerciais leves
-        "8702",  # Vans/ônibus
+    Regras por cenário (HS6 = NCM // 100, HS4 = NCM // 10000):
+    - pre_trump: 2% para todos
+    - liberation_day: 0% isentos (HS6), 25% veículos (HS4), 10% para o resto
+    - august_1st / trump_final: 0% isentos, 25% veículos, 10% lista
+      específica (HS6), 50% para o resto
+    - NCM ausente recebe a tarifa padrão do cenário (10% ou 50%);
+      cenários não reconhecidos ficam em 2% (50% sem NCM)
+    
+    Args:
+        ncm_series (Series): Códigos NCM
+        scenario (str): 'pre_trump', 'liberation_day', 'august_1st' ou 'trump_final'
         
-        # PARTES & ACESSÓRIOS
-        "8708"   # Partes e acessórios para veículos
-    }
+    Returns:
+        Series: Tarifa (%) de cada NCM, no mesmo índice da entrada
+    """
+    if scenario == "pre_trump":
+        return pd.Series(2.0, index=ncm_series.index)
     
-    # Lista de códigos HS6 com tarifa de 10% baseada na proposta do Trump (379 códigos únicos)
-    trump_10_percent_codes = {
-        "080121", "200830", "200911", "200912", "252510", "260111", "260112", "260900", "270111", "270112",
-        "270119", "270120", "270210", "270220", "270300", "270400", "270500", "270600", "270710", "270720",
-        "270730", "270740", "270750", "270791", "270799", "270810", "270820", "270900", "271012", "271019",
-        "271020", "271091", "271099", "271111", "271112", "271113", "271114", "271119", "271121", "271129",
-        "271210", "271220", "271290", "271311", "271312", "271320", "271390", "271410", "271490", "271500",
-        "271600", "280469", "281520", "281820", "282590", "282739", "290319", "310510", "310520", "310560",
-        "391721", "391722", "391723", "391729", "391731", "391733", "391739", "391740", "392690", "400829",
-        "400912", "400922", "400932", "400942", "401130", "401213", "401220", "401610", "401693", "401699",
-        "401700", "440729", "450490", "470200", "470311", "470319", "470321", "470329", "470411", "470419",
-        "470421", "470429", "470500", "470610", "470620", "470630", "470691", "470692", "470693", "482390",
-        "560721", "680299", "681280", "681299", "681320", "681381", "681389", "700721", "710691", "710812",
-        "720110", "720120", "720150", "720260", "720293", "720310", "720390", "730431", "730439", "730441",
-        "730449", "730451", "730459", "730490", "730630", "730640", "730650", "730661", "730669", "731210",
-        "731290", "732290", "732410", "732490", "732620", "741300", "760810", "760820", "800200", "810890",
-        "830210", "830220", "830242", "830249", "830260", "830710", "830790", "840710", "840890", "840910",
-        "841111", "841112", "841121", "841122", "841181", "841182", "841191", "841199", "841210", "841221",
-        "841229", "841231", "841239", "841280", "841290", "841319", "841320", "841330", "841350", "841360",
-        "841370", "841381", "841391", "841410", "841420", "841430", "841451", "841459", "841480", "841490",
-        "841510", "841581", "841582", "841583", "841590", "841810", "841830", "841840", "841861", "841869",
-        "841950", "841981", "841990", "842119", "842121", "842123", "842129", "842131", "842132", "842139",
-        "842410", "842511", "842519", "842531", "842539", "842542", "842549", "842699", "842810", "842820",
-        "842833", "842839", "842890", "844331", "844332", "847141", "847149", "847150", "847160", "847170",
-        "847989", "847990", "848310", "848330", "848340", "848350", "848360", "848390", "848410", "848490",
-        "850120", "850131", "850132", "850133", "850134", "850140", "850151", "850152", "850153", "850161",
-        "850162", "850163", "850171", "850172", "850180", "850211", "850212", "850213", "850220", "850231",
-        "850239", "850240", "850410", "850431", "850432", "850433", "850440", "850450", "850710", "850720",
-        "850730", "850750", "850760", "850780", "850790", "851110", "851120", "851130", "851140", "851150",
-        "851180", "851420", "851680", "851713", "851714", "851761", "851762", "851769", "851771", "851810",
-        "851821", "851822", "851829", "851830", "851840", "851850", "851981", "851989", "852110", "852290",
-        "852610", "852691", "852692", "852842", "852852", "852862", "852910", "852990", "853110", "853120",
-        "853180", "853670", "853910", "853951", "854370", "854390", "854430", "880100", "880211", "880212",
-        "880220", "880230", "880240", "880529", "880610", "880621", "880622", "880623", "880624", "880629",
-        "880691", "880692", "880693", "880694", "880699", "880710", "880720", "880730", "880790", "900190",
-        "900290", "901410", "901420", "901490", "902000", "902511", "902519", "902580", "902590", "902610",
-        "902620", "902680", "902690", "902910", "902920", "902990", "903010", "903020", "903031", "903032",
-        "903033", "903039", "903040", "903084", "903089", "903090", "903180", "903190", "903210", "903220",
-        "940511", "940519", "940561", "940569", "940592", "940599", "962000", "980200", "981800"
-    }
+    ncm = pd.to_numeric(ncm_series, errors='coerce')
+    valid = ncm.notna().to_numpy()
     
-    # Extrair os primeiros 4 e 6 dígitos do NCM para comparação
-    if pd.isna(ncm_code) or str(ncm_code).strip() == "":
-        if scenario == "pre_trump":
-            return 2.0
-        elif scenario == "liberation_day":
-            return 10.0
-        else:  # august_1st ou trump_final
-            return 50.0
+    if scenario == "liberation_day":
+        default = 10.0
+    elif scenario in ["august_1st", "trump_final"]:
+        default = 50.0
+    else:  # Cenários não reconhecidos
+        return pd.Series(np.where(valid, 2.0, 50.0), index=ncm_series.index)
+    ncm_int = np.where(valid, ncm.to_numpy(dtype=np.float64, na_value=0.0), 0.0).astype(np.int64)
+    hs4, hs6 = ncm_int // 10000, ncm_int // 100
+    
+    # Sobrepondo da menor para a maior prioridade: lista de 10% < veículos < isentos
+    out = np.full(len(ncm_int), default)
+    if scenario != "liberation_day":
+        out[np.isin(hs6, TRUMP_10_PERCENT_HS6) & valid] = 10.0
+    out[np.isin(hs4, TRUMP_25_PERCENT_HS4) & valid] = 25.0
+    out[np.isin(hs6, TRUMP_0_PERCENT_HS6) & valid] = 0.0
+    return pd.Series(out, index=ncm_series.index)
+
+@st.cache_data(show_spinner=False)
+def _product_ncm_map(data_version, _export_data):
+    """
+    Primeiro CO_NCM de cada produto, calculado em um único groupby
     
-    ncm_str = str(int(float(ncm_code)))  # Converter para string removendo decimais
-    hs4_code = ncm_str[:4] if len(ncm_str) >= 4 else ncm_str
-    hs6_code = ncm_str[:6] if len(ncm_str) >= 6 else ncm_str
+    Args:
+        data_version (tuple): Versão dos arquivos (chave do cache)
+        _export_data (DataFrame): Dados de exportação (fora do hash)
+        
+    Returns:
+        Series: CO_NCM indexado pelo nome do produto
+    """
+    ncm_map = _export_data.groupby('Produto', sort=False, observed=True)['CO_NCM'].first()
+    ncm_map.index = ncm_map.index.astype(object)
+    return ncm_map
+
+@st.cache_data
+def _scenario_tariffs(data_version, _export_data, produtos, scenario="trump_final"):
+    """
+    Calcula a tarifa do cenário para cada linha da tabela do simulador
     
-    # CENÁRIO LIBERATION DAY (10% para todos, exceto exceções)
-    if scenario == "liberation_day":
-        if hs6_code in trump_0_percent_codes:
-            return 0.0  # Produtos isentos
-        elif hs4_code in trump_25_percent_codes:
-            return 25.0  # Veículos mantêm 25%
-        else:
-            return 10.0  # Todo o resto vai para 10%
+    Cacheada: as tarifas base e as de cada botão de cenário são calculadas
+    uma única vez, fora do caminho de renderização.
     
-    # CENÁRIOS AUGUST 1ST e TRUMP FINAL (50% para todos, exceto exceções)
-    elif scenario in ["august_1st", "trump_final"]:
-        # Prioridade: 1º isentos (0%), 2º veículos (25%), 3º específicos (10%), 4º padrão (50%)
-        if hs6_code in trump_0_percent_codes:
-            return 0.0  # Produtos isentos
-        elif hs4_code in trump_25_percent_codes:
-            return 25.0  # Veículos mantêm 25%
-        elif hs6_code in trump_10_percent_codes:
-            return 10.0  # Produtos com tarifa reduzida
-        else:
-            return 50.0  # Tarifa padrão para todo o resto
+    Args:
+        data_version (tuple): Versão dos arquivos (chave do cache)
+        _export_data (DataFrame): Dados de exportação (fonte do CO_NCM)
+        produtos (tuple): Nomes dos produtos, na ordem das linhas do simulador
+        scenario (str): Cenário repassado para build_tariff_table
+        
+    Returns:
+        np.ndarray: Tarifas (%) em float32, na ordem de produtos
+    """
+    # Lookup do CO_NCM por produto ("Outros" não tem NCM e recebe a tarifa padrão)
+    ncm_codes = _product_ncm_map(data_version, _export_data).reindex(list(produtos))
+    return build_tariff_table(ncm_codes, scenario).to_numpy(dtype=np.float32)
+
+@st.cache_data(show_spinner=False)
+def _simulator_static_cols(product_table):
+    """
+    Colunas do simulador que não dependem das tarifas, já formatadas para exibição
     
-    # Fallback para cenários não reconhecidos
-    return 2.0
+    Args:
+        product_table (DataFrame): Tabela Top 100 + Outros
+        
+    Returns:
+        dict: produto, valor e pct formatados, além do array vl_fob_mi
+    """
+    vl_fob_mi = product_table['VL_FOB_MI'].to_numpy()
+    return {
+        'produto': product_table['Produto'].to_numpy(),
+        'valor': np.char.mod('%.1f', vl_fob_mi / 1000),
+        'pct': np.char.mod('%.1f%%', product_table['Percentual'].to_numpy()),
+        'vl_fob_mi': vl_fob_mi,
+    }
 
-def create_compact_tariff_simulator(export_data):
-    """Cria simulador de tarifas compacto estilo tabela com Top 100"""
+@st.fragment
+def create_compact_tariff_simulator(export_data, product_table, data_version):
+    """
+    Cria simulador de tarifas compacto estilo tabela com Top 100
+    
+    Executado como st.fragment: botões e edições na tabela reexecutam apenas
+    esta seção, sem refazer o gráfico principal e o restante da página.
+    
+    Args:
+        export_data (DataFrame): Dados de exportação (fonte do CO_NCM)
+        product_table (DataFrame): Tabela Top 100 + Outros, montada pela página
+        data_version (tuple): Versão dos arquivos, chave dos caches derivados
+    """
     
     st.subheader("🏛️ Simulador de Cenários Tarifários")
     st.info("💡 **Evolução das Tarifas do Trump:** 0% para produtos isentos (energia, minerais críticos, eletrônicos), 25% para veículos (Seção 232), 10% para produtos específicos, 50% para o resto")
     
-    # Criando tabela Top 100 para o simulador
-    product_table = create_top100_for_simulator(export_data)
+    # Tarifas do simulador em um único array na sessão (uma posição por linha da tabela)
+    # (refeito quando os dados mudam: o Top 100 pode ter outros produtos)
+    produtos = tuple(product_table['Produto'])
+    if st.session_state.get('tariffs_version') != data_version:
+        st.session_state['tariffs'] = _scenario_tariffs(data_version, export_data, produtos)
+        st.session_state['tariffs_version'] = data_version
+    tariffs = st.session_state['tariffs']
     
     # Cenários temporais baseados na cronologia do Trump
     st.markdown("### 📅 **Cenários Temporais das Tarifas**")
@@ -613,75 +1081,46 @@ def create_compact_tariff_simulator(export_data):
     
     with col1:
         if st.button("🏛️ Pré-Trump (~2%)", use_container_width=True):
-            for i, (idx, row) in enumerate(product_table.iterrows()):
-                matching_products = export_data[export_data['Produto'] == row['Produto']]
-                ncm_code = None
-                if not matching_products.empty and 'CO_NCM' in matching_products.columns:
-                    ncm_code = matching_products.iloc[0]['CO_NCM']
-                trump_tariff = get_trump_tariff(ncm_code, scenario="pre_trump")
-                st.session_state[f"tariff_{i}"] = trump_tariff
+            tariffs[:] = _scenario_tariffs(data_version, export_data, produtos, scenario="pre_trump")
     
     with col2:
         if st.button("🎯 Liberation Day (10%)", use_container_width=True):
-            for i, (idx, row) in enumerate(product_table.iterrows()):
-                matching_products = export_data[export_data['Produto'] == row['Produto']]
-                ncm_code = None
-                if not matching_products.empty and 'CO_NCM' in matching_products.columns:
-                    ncm_code = matching_products.iloc[0]['CO_NCM']
-                trump_tariff = get_trump_tariff(ncm_code, scenario="liberation_day")
-                st.session_state[f"tariff_{i}"] = trump_tariff
+            tariffs[:] = _scenario_tariffs(data_version, export_data, produtos, scenario="liberation_day")
     
     with col3:
         if st.button("⚡ 1º Agosto (50%)", use_container_width=True):
-            for i, (idx, row) in enumerate(product_table.iterrows()):
-                matching_products = export_data[export_data['Produto'] == row['Produto']]
-                ncm_code = None
-                if not matching_products.empty and 'CO_NCM' in matching_products.columns:
-                    ncm_code = matching_products.iloc[0]['CO_NCM']
-                trump_tariff = get_trump_tariff(ncm_code, scenario="august_1st")
-                st.session_state[f"tariff_{i}"] = trump_tariff
+            tariffs[:] = _scenario_tariffs(data_version, export_data, produtos, scenario="august_1st")
     
     st.markdown("### 📊 Simulador Interativo (Top 100 Produtos)")
     
-    # Dados para o DataFrame
-    simulator_data = []
-    total_export_value = product_table['VL_FOB_MI'].sum()
-    
-    for idx, row in product_table.iterrows():
-        # Inicializar tarifa se não existe
-        tariff_key = f"tariff_{idx}"
-        if tariff_key not in st.session_state:
-            # Buscar CO_NCM nos dados originais para aplicar tarifa do Trump
-            ncm_code = None
-            # Tentar encontrar o CO_NCM correspondente no export_data
-            matching_products = export_data[export_data['Produto'] == row['Produto']]
-            if not matching_products.empty and 'CO_NCM' in matching_products.columns:
-                ncm_code = matching_products.iloc[0]['CO_NCM']
-            
-            # Aplicar tarifa baseada na lista do Trump
-            base_tariff = get_trump_tariff(ncm_code)
-            st.session_state[tariff_key] = base_tariff
-        
-        current_tariff = st.session_state[tariff_key]
-        
-        # Calculando impacto
-        impact_usd_bi = (current_tariff / 100) * (row['VL_FOB_MI'] / 1000)  # Convertendo para bilhões
-        
-        simulator_data.append({
-            'Produto/Grupo': row['Produto'],  # Nome completo sem cortar
-            'Valor Exportado (USD Bi)': f"{row['VL_FOB_MI']/1000:.1f}",
-            '% do Total': f"{row['Percentual']:.1f}%",
-            'Tarifa Atual (%)': current_tariff,
-            'Impacto (USD Bi)': f"{impact_usd_bi:.2f}",
-            'idx': idx  # Para controle interno
-        })
-    
-    # Convertendo para DataFrame
-    df_simulator = pd.DataFrame(simulator_data)
+    # Colunas fixas já formatadas (cacheadas); só tarifa e impacto mudam por rerun
+    static_cols = _simulator_static_cols(product_table)
+    vl_fob_mi = static_cols['vl_fob_mi']
+    total_export_value = vl_fob_mi.sum()
+    
+    # Edições da tabela: o editor guarda só as linhas alteradas, aplicadas por índice.
+    # Aplicadas antes de montar a tabela, o impacto já reflete a célula recém-editada
+    edited_rows = st.session_state.get('tariff_editor', {}).get('edited_rows', {})
+    for row, changes in edited_rows.items():
+        new_tariff = changes.get('Tarifa Atual (%)')
+        if new_tariff is not None and int(row) < len(tariffs):  # Célula apagada mantém o valor anterior
+            tariffs[int(row)] = new_tariff
+    current_tariffs = tariffs.astype(np.float64)
+    
+    # Calculando impacto (convertendo para bilhões)
+    impact_usd_bi = (current_tariffs / 100) * (vl_fob_mi / 1000)
+    
+    df_simulator = pd.DataFrame({
+        'Produto/Grupo': static_cols['produto'],  # Nome completo sem cortar
+        'Valor Exportado (USD Bi)': static_cols['valor'],
+        '% do Total': static_cols['pct'],
+        'Tarifa Atual (%)': current_tariffs,
+        'Impacto (USD Bi)': np.char.mod('%.2f', impact_usd_bi)
+    })
     
     # Editando a tabela
     edited_df = st.data_editor(
-        df_simulator[['Produto/Grupo', 'Valor Exportado (USD Bi)', '% do Total', 'Tarifa Atual (%)', 'Impacto (USD Bi)']],
+        df_simulator,
         column_config={
             "Produto/Grupo": st.column_config.TextColumn("Produto/Grupo", disabled=True),
             "Valor Exportado (USD Bi)": st.column_config.TextColumn("Valor Exportado\n(USD Bi)", disabled=True),
@@ -700,69 +1139,29 @@ def create_compact_tariff_simulator(export_data):
         key="tariff_editor"
     )
     
-    # Atualizando session state com valores editados
-    for i, row in edited_df.iterrows():
-        tariff_key = f"tariff_{i}"
-        # Extraindo o valor numérico da string de tarifa
-        tariff_str = str(row['Tarifa Atual (%)'])
-        try:
-            if '%' in tariff_str:
-                tariff_value = float(tariff_str.replace('%', ''))
-            else:
-                tariff_value = float(tariff_str)
-            st.session_state[tariff_key] = tariff_value
-        except:
-            pass  # Manter valor anterior se conversão falhar
-    
     # Calculando totais
     st.markdown("### 📈 Resumo do Impacto")
     
     col1, col2, col3, col4 = st.columns(4)
     
     # Recalculando com valores atualizados usando TODOS os produtos para maior precisão
-    total_impact = 0
-    weighted_tariff_sum = 0
-    
-    # Preparar dados dos últimos 12 meses para cálculo preciso
-    dados_12m = export_data.copy()
-    dados_12m['Data'] = pd.to_datetime(dados_12m['Data'])
-    max_date = dados_12m['Data'].max()
-    start_date = max_date - pd.DateOffset(months=11)
-    dados_12m = dados_12m[dados_12m['Data'] >= start_date]
-    
-    # Agregar todos os produtos por NCM
-    produtos_12m = dados_12m.groupby('CO_NCM').agg({
-        'VL_FOB': 'sum',
-        'Produto': 'first'
-    }).reset_index()
-    
-    total_exportado_todos = produtos_12m['VL_FOB'].sum()
+    # Últimos 12 meses agregados por NCM (cacheado, mesma base do gráfico de evolução)
+    produtos_12m, total_exportado_todos = _agg_12m(data_version, export_data)
+    
+    # Detectar cenário atual analisando algumas tarifas da sessão
+    avg_tariff = float(tariffs[:10].mean())
+    if avg_tariff < 5:
+        scenario_detected = "pre_trump"
+    elif avg_tariff < 15:
+        scenario_detected = "liberation_day"
+    else:
+        scenario_detected = "august_1st"
     
-    # Detectar cenário atual baseado nos session_state
-    scenario_detected = "august_1st"  # default (cenário final)
-    if any(f"tariff_{i}" in st.session_state for i in range(len(product_table))):
-        # Analisar algumas tarifas para detectar o cenário
-        sample_tariffs = []
-        for idx in range(min(10, len(product_table))):
-            if f"tariff_{idx}" in st.session_state:
-                sample_tariffs.append(st.session_state[f"tariff_{idx}"])
-        
-        if sample_tariffs:
-            avg_tariff = sum(sample_tariffs) / len(sample_tariffs)
-            if avg_tariff < 5:
-                scenario_detected = "pre_trump"
-            elif avg_tariff < 15:
-                scenario_detected = "liberation_day"
-            else:
-                scenario_detected = "august_1st"
-    
-    # Calcular usando todos os produtos com o cenário detectado
-    for _, row in produtos_12m.iterrows():
-        current_tariff = get_trump_tariff(row['CO_NCM'], scenario=scenario_detected)
-        valor_bi = row['VL_FOB'] / 1_000_000_000  # Converter para bilhões
-        impact = (current_tariff / 100) * valor_bi
-        total_impact += impact
-        weighted_tariff_sum += (current_tariff * row['VL_FOB'] / total_exportado_todos)
+    # Calcular usando todos os produtos com o cenário detectado (vetorizado)
+    tariffs_12m = build_tariff_table(produtos_12m['CO_NCM'], scenario_detected).to_numpy()
+    vl_fob_12m = produtos_12m['VL_FOB'].to_numpy(dtype=np.float64)
+    total_impact = float(((tariffs_12m / 100) * (vl_fob_12m / 1_000_000_000)).sum())  # Em bilhões
+    weighted_tariff_sum = float((tariffs_12m * vl_fob_12m).sum() / total_exportado_todos)
     
     with col1:
         st.metric("Total Exportado", f"US$ {total_export_value/1000:.1f} Bi")
@@ -781,29 +1180,38 @@ def create_compact_tariff_simulator(export_data):
             st.metric("% do PIB", f"{impact_pib_percentage:.2f}%")
     
     # Gráfico de evolução da tarifa efetiva por cenário
-    create_tariff_evolution_chart(export_data)
+    create_tariff_evolution_chart(export_data, data_version)
     
     return edited_df
 
-def create_tariff_evolution_chart(export_data):
-    """Cria gráfico de barras mostrando evolução da tarifa efetiva nos cenários temporais"""
+@st.cache_data(show_spinner=False)
+def _scenario_effective_tariffs(data_version, _export_data):
+    """
+    Tarifa efetiva ponderada pelas exportações dos últimos 12 meses, por cenário
     
-    st.markdown("### 📈 **Evolução da Tarifa Efetiva por Cenário**")
+    Depende apenas dos dados (não das edições do simulador), então é calculada
+    uma vez por versão dos dados.
     
-    # Verificar se há valores atuais no session_state para mostrar o cenário atual
-    product_table = create_top100_for_simulator(export_data)
-    current_scenario_tariff = 0
-    total_export_value = product_table['VL_FOB_MI'].sum()
-    
-    # Calcular tarifa efetiva atual baseada no session_state
-    if any(f"tariff_{i}" in st.session_state for i in range(len(product_table))):
-        weighted_tariff_sum = 0
-        for idx, row in product_table.iterrows():
-            current_tariff = st.session_state.get(f"tariff_{idx}", 0)
-            weighted_tariff_sum += (current_tariff * row['VL_FOB_MI'] / total_export_value)
-        current_scenario_tariff = weighted_tariff_sum
+    Args:
+        data_version (tuple): Versão dos arquivos (chave do cache)
+        _export_data (DataFrame): Dados de exportação (fora do hash)
         
+    Returns:
+        dict: Código do cenário -> tarifa efetiva (%)
+    """
+    # Últimos 12 meses agregados por NCM (mesma base do resumo)
+    produtos_12m, total_exportado = _agg_12m(data_version, _export_data)
+    vl_fob = produtos_12m['VL_FOB'].to_numpy(dtype=np.float64)
+    
+    return {
+        scenario: float((build_tariff_table(produtos_12m['CO_NCM'], scenario).to_numpy() * vl_fob).sum() / total_exportado)
+        for scenario in ("pre_trump", "liberation_day", "august_1st")
+    }
 
+def create_tariff_evolution_chart(export_data, data_version):
+    """Cria gráfico de barras mostrando evolução da tarifa efetiva nos cenários temporais"""
+    
+    st.markdown("### 📈 **Evolução da Tarifa Efetiva por Cenário**")
     
     # Calcular tarifa efetiva para cada cenário teórico usando a MESMA base do simulador
     scenarios = {
@@ -812,67 +1220,52 @@ def create_tariff_evolution_chart(export_data):
         "1º Agosto": "august_1st"
     }
     
-    # Calcular tarifa efetiva para cada cenário usando TODOS OS PRODUTOS (igual ao resumo)
-    scenario_results = []
-    
-    # Preparar dados dos últimos 12 meses para cálculo preciso (igual ao resumo)
-    dados_12m_grafico = export_data.copy()
-    dados_12m_grafico['Data'] = pd.to_datetime(dados_12m_grafico['Data'])
-    max_date_grafico = dados_12m_grafico['Data'].max()
-    start_date_grafico = max_date_grafico - pd.DateOffset(months=11)
-    dados_12m_grafico = dados_12m_grafico[dados_12m_grafico['Data'] >= start_date_grafico]
-    
-    # Agregar todos os produtos por NCM
-    produtos_12m_grafico = dados_12m_grafico.groupby('CO_NCM').agg({
-        'VL_FOB': 'sum',
-        'Produto': 'first'
-    }).reset_index()
-    
-    total_exportado_grafico = produtos_12m_grafico['VL_FOB'].sum()
-    
-    for scenario_name, scenario_code in scenarios.items():
-        weighted_tariff_sum = 0
+    # Tarifa efetiva de cada cenário usando TODOS OS PRODUTOS (cacheada: não depende da sessão)
+    effective_tariffs = _scenario_effective_tariffs(data_version, export_data)
+    scenario_results = [
+        {'Cenário': scenario_name, 'Tarifa Efetiva (%)': effective_tariffs[scenario_code]}
+        for scenario_name, scenario_code in scenarios.items()
+    ]
+    
+    # Figura reaproveitada entre reruns do fragment: só é refeita quando os dados mudam
+    # (as barras não dependem das edições de tarifa feitas no simulador)
+    evo_label = data_version
+    if st.session_state.get('evo_label') != evo_label:
+        # Criar DataFrame para o gráfico
+        df_evolution = pd.DataFrame(scenario_results)
         
-        # Calcular usando TODOS os produtos (igual ao resumo)
-        for _, row in produtos_12m_grafico.iterrows():
-            current_tariff = get_trump_tariff(row['CO_NCM'], scenario=scenario_code)
-            weighted_tariff_sum += (current_tariff * row['VL_FOB'] / total_exportado_grafico)
+        # Criar gráfico de barras com Plotly (go.Bar direto: só três barras)
+        tarifas_efetivas = df_evolution['Tarifa Efetiva (%)'].to_numpy()
+        fig = go.Figure(go.Bar(
+            x=df_evolution['Cenário'].to_numpy(),
+            y=tarifas_efetivas,
+            marker=dict(
+                color=tarifas_efetivas,
+                colorscale='Reds',
+                showscale=True,
+                colorbar=dict(title='Tarifa Efetiva (%)')
+            ),
+            text=tarifas_efetivas,
+            texttemplate='%{text:.1f}%',
+            textposition='outside',
+            hovertemplate='Cenário=%{x}<br>Tarifa Efetiva (%)=%{y}<extra></extra>'
+        ))
         
-        scenario_results.append({
-            'Cenário': scenario_name,
-            'Tarifa Efetiva (%)': weighted_tariff_sum
-        })
-    
-    # Criar DataFrame para o gráfico
-    df_evolution = pd.DataFrame(scenario_results)
-    
-    # Criar gráfico de barras com Plotly
-    import plotly.express as px
-    
-    fig = px.bar(
-        df_evolution,
-        x='Cenário',
-        y='Tarifa Efetiva (%)',
-        title='Evolução da Tarifa Efetiva por Cenário Temporal',
-        color='Tarifa Efetiva (%)',
-        color_continuous_scale='Reds',
-        text='Tarifa Efetiva (%)'
-    )
-    
-    # Customizar o gráfico
-    fig.update_traces(
-        texttemplate='%{text:.1f}%',
-        textposition='outside'
-    )
-    
-    fig.update_layout(
-        height=500,
-        showlegend=False,
-        xaxis_title="Cenário Temporal",
-        yaxis_title="Tarifa Efetiva (%)",
-        title_x=0.5,
-        yaxis=dict(range=[0, max(df_evolution['Tarifa Efetiva (%)']) * 1.1])
-    )
+        # Customizar o gráfico
+        fig.update_layout(title='Evolução da Tarifa Efetiva por Cenário Temporal')
+        
+        fig.update_layout(
+            height=500,
+            showlegend=False,
+            xaxis_title="Cenário Temporal",
+            yaxis_title="Tarifa Efetiva (%)",
+            title_x=0.5,
+            yaxis=dict(range=[0, max(df_evolution['Tarifa Efetiva (%)']) * 1.1])
+        )
+        
+        st.session_state['evo_label'] = evo_label
+        st.session_state['evo_fig'] = fig
+    fig = st.session_state['evo_fig']
     
     # Exibir o gráfico
     st.plotly_chart(fig, use_container_width=True)
@@ -892,82 +1285,21 @@ def create_tariff_evolution_chart(export_data):
         st.write("• **1º Agosto**: 50% geral + exceções (cenário final)")
 
 # =============================================================================
-# FUNÇÃO PRINCIPAL DO DASHBOARD
+# SEÇÕES DA PÁGINA (FRAGMENTS)
 # =============================================================================
 
-def main():
+@st.fragment
+def create_overview_section(trade_monthly, data_version):
     """
-    Função principal que coordena todo o dashboard Streamlit
+    Gráfico principal do comércio e métricas dinâmicas do último mês
     
-    Estrutura:
-    1. Carregamento e processamento dos dados
-    2. Interface de controles no sidebar
-    3. Gráfico principal interativo
-    4. Métricas de resumo
-    5. Tabela de produtos exportados
-    6. Simulador de cenários tarifários
-    7. Análise por produto específico
-    """
+    Executado como st.fragment: o seletor de visualização reexecuta apenas
+    esta seção, sem refazer tabelas, simulador e análise por produto.
     
-    # =============================================================================
-    # 1. CABEÇALHO E TÍTULO
-    # =============================================================================
-    
-    st.title("📊 Trade Balance Brasil-EUA")
-    st.markdown("### Análise Completa do Comércio Bilateral")
-    
-    # Explicação dos indicadores
-    with st.expander("ℹ️ Explicação dos Indicadores"):
-        st.markdown("""
-        **📈 Exportações/Importações**: Valor em milhões de USD (ex: 41.418 = 41 bilhões e 418 milhões)
-        
-        **⚖️ Trade Balance**: Diferença entre exportações e importações
-        - Positivo = Superávit (exportamos mais do que importamos)
-        - Negativo = Déficit (importamos mais do que exportamos)
-        
-        **🎯 Cobertura das Importações**: Quantas vezes as exportações "cobrem" as importações
-        - 0.95x = Exportações cobrem 95% das importações (déficit de 5%)
-        - 1.20x = Exportações cobrem 120% das importações (superávit de 20%)
-        - Valores > 1.0 = Superávit comercial
-        - Valores < 1.0 = Déficit comercial
-        """)
-    
-    st.markdown("---")
-    
-    # =============================================================================
-    # 2. CARREGAMENTO E PROCESSAMENTO DOS DADOS
-    # =============================================================================
-    
-    # Carregando dados
-    with st.spinner("Carregando dados..."):
-        export_data, import_data = load_data()
-        
-        if export_data is None or import_data is None:
-            st.error("❌ **Dados não disponíveis**")
-            st.warning("⚠️ Os arquivos CSV não foram encontrados e o GitHub Release ainda não foi criado.")
-            
-            st.info("📋 **Para resolver este problema:**")
-            st.markdown("""
-            1. **Acesse:** https://github.com/ealmeida11/dashboard-brasil-eua/releases
-            2. **Clique:** "Create a new release"
-            3. **Tag version:** `v1.0.0`
-            4. **Release title:** "Dados do Dashboard Brasil-EUA"
-            5. **Anexe os arquivos:**
-               - `dados_brasil_eua_exportacao.csv`
-               - `dados_brasil_eua_importacao.csv`
-            6. **Publish release**
-            
-            Após criar o release, o dashboard carregará automaticamente os dados!
-            """)
-            
-            st.info("💡 **Alternativa:** Faça upload manual dos arquivos CSV na pasta raiz do projeto.")
-            st.stop()
-        
-        trade_monthly = create_monthly_aggregation(export_data, import_data)
-    
-    # =============================================================================
-    # 3. GRÁFICO PRINCIPAL COM CONTROLES INTEGRADOS
-    # =============================================================================
+    Args:
+        trade_monthly (DataFrame): Agregação mensal (create_monthly_aggregation)
+        data_version (tuple): Versão dos arquivos, chave do cache da Figure
+    """
     
     st.subheader("📈 Visão Geral do Comércio")
     
@@ -979,28 +1311,27 @@ def main():
     )
     
     # Gráfico principal
-    trade_fig = create_trade_chart(trade_monthly, view_type)
+    # Chave do cache da Figure: a mesma versão dos arquivos que chaveia a agregação (O(1))
+    trade_fig = create_trade_chart(data_version, view_type, trade_monthly)
     st.plotly_chart(trade_fig, use_container_width=True)
     
-    # =============================================================================
-    # 4. MÉTRICAS DINÂMICAS (MUDAM CONFORME TIPO DE VISUALIZAÇÃO)
-    # =============================================================================
-    
+    # Métricas dinâmicas (mudam conforme tipo de visualização)
     col1, col2, col3, col4, col5 = st.columns(5)
     
-    latest_data = trade_monthly.iloc[-1]
-    
     # Selecionando métricas baseado no tipo de visualização
     if view_type == "Acumulado 12M":
-        exp_val, imp_val, bal_val = latest_data['Exp_12M'], latest_data['Imp_12M'], latest_data['Balance_12M']
+        metric_cols = ('Exp_12M', 'Imp_12M', 'Balance_12M')
         suffix = "(12M)"
     elif view_type == "Mensal Saz. Ajust. Anualizado":
-        exp_val, imp_val, bal_val = latest_data['Exp_SA'], latest_data['Imp_SA'], latest_data['Balance_SA']
+        metric_cols = ('Exp_SA', 'Imp_SA', 'Balance_SA')
         suffix = "(SA Anual)"
     else:  # 3MMA
-        exp_val, imp_val, bal_val = latest_data['Exp_3MMA_SA'], latest_data['Imp_3MMA_SA'], latest_data['Balance_3MMA_SA']
+        metric_cols = ('Exp_3MMA_SA', 'Imp_3MMA_SA', 'Balance_3MMA_SA')
         suffix = "(3MMA SA)"
     
+    # Último mês lido direto dos arrays (sem montar a linha inteira com iloc)
+    exp_val, imp_val, bal_val = (trade_monthly[col].to_numpy()[-1] for col in metric_cols)
+    
     with col1:
         # Convertendo para bilhões e formatação brasileira
         st.metric(f"Exportações {suffix}", f"US$ {exp_val/1000:.1f} Bi")
@@ -1026,29 +1357,20 @@ def main():
             f"{coverage_ratio:.2f}x",
             help="Quantas vezes as exportações cobrem as importações. Valores > 1 indicam superávit comercial."
         )
+
+@st.fragment
+def create_product_analysis(export_data, import_data, data_version):
+    """
+    Análise por produto específico: seletores, gráfico e estatísticas
     
-    # Tabela de produtos
-    st.subheader("📦 Principais Produtos Exportados (Top 10 + Outros)")
-    
-    product_table = create_product_table(export_data)
-    
-    # Formatando a tabela para exibição (formato brasileiro)
-    display_table = product_table.copy()
-    display_table['Valor (US$ Mi)'] = display_table['VL_FOB_MI'].apply(lambda x: f"{x:,.0f}".replace(",", "."))
-    display_table['Participação (%)'] = display_table['Percentual'].apply(lambda x: f"{x:.1f}%")
-    display_table = display_table[['Produto', 'Valor (US$ Mi)', 'Participação (%)']]
-    
-    st.dataframe(display_table, use_container_width=True, hide_index=True)
-    
-    # =============================================================================
-    # 5. SIMULADOR DE TARIFAS COMPACTO
-    # =============================================================================
-    
-    tariff_data = create_compact_tariff_simulator(export_data)
+    Executado como st.fragment: trocar produto, tipo de comércio ou
+    visualização reexecuta apenas esta seção.
     
-    # =============================================================================
-    # 6. ANÁLISE POR PRODUTO ESPECÍFICO
-    # =============================================================================
+    Args:
+        export_data (DataFrame): Dados de exportação
+        import_data (DataFrame): Dados de importação
+        data_version (tuple): Versão dos arquivos, chave dos caches derivados
+    """
     
     st.subheader("🔍 Análise por Produto Específico")
     
@@ -1057,9 +1379,7 @@ def main():
     
     with col1:
         # Lista de produtos únicos (combinando exportação e importação)
-        all_products_exp = set(export_data['Produto'].unique())
-        all_products_imp = set(import_data['Produto'].unique())
-        all_products = sorted(list(all_products_exp.union(all_products_imp)))
+        all_products = unique_products(data_version, export_data, import_data)
         selected_product = st.selectbox("Selecione um produto:", all_products)
     
     with col2:
@@ -1081,43 +1401,19 @@ def main():
     if selected_product:
         # Filtrando dados do produto baseado no tipo selecionado
         if trade_type == "Exportação":
-            product_data_raw = export_data[export_data['Produto'] == selected_product].groupby('Data')['VL_FOB'].sum().reset_index()
             chart_color = '#2E8B57'  # Verde
             y_title = "Exportações (US$ Bi)"
         else:
-            product_data_raw = import_data[import_data['Produto'] == selected_product].groupby('Data')['VL_FOB'].sum().reset_index()
             chart_color = '#DC143C'  # Vermelho
             y_title = "Importações (US$ Bi)"
         
-        if not product_data_raw.empty:
-            # Convertendo para bilhões de USD
-            product_data_raw['VL_FOB_BI'] = product_data_raw['VL_FOB'] / 1000000000
-            product_data_raw = product_data_raw.sort_values('Data')
-            
-            # Calculando métricas
-            product_data = product_data_raw.copy()
-            
-            # Acumulado 12M
-            product_data['Value_12M'] = product_data['VL_FOB_BI'].rolling(window=12, min_periods=1).sum()
-            
-            # Ajuste sazonal (se possível)
-            if len(product_data) >= 24 and HAS_STATSMODELS:
-                try:
-                    decomp = seasonal_decompose(
-                        product_data['VL_FOB_BI'].fillna(product_data['VL_FOB_BI'].mean()), 
-                        model='additive', 
-                        period=12,
-                        extrapolate_trend='freq'
-                    )
-                    sa_data = (decomp.trend + decomp.resid) * 12
-                    product_data['Value_SA'] = sa_data.interpolate(method='linear').bfill().ffill()
-                except:
-                    product_data['Value_SA'] = product_data['VL_FOB_BI'] * 12
-            else:
-                product_data['Value_SA'] = product_data['VL_FOB_BI'] * 12
-            
-            # 3MMA SA
-            product_data['Value_3MMA_SA'] = product_data['Value_SA'].rolling(window=3, min_periods=1).mean()
+        # Séries do produto (12M, SA e 3MMA SA) cacheadas por (tipo de comércio, produto):
+        # trocar só a visualização não refaz nenhuma conta
+        product_data = product_series_views(data_version, export_data, import_data, trade_type, selected_product)
+        
+        if product_data is not None:
+            vl_bi = product_data['VL_FOB_BI'].to_numpy()
+            value_12m = product_data['Value_12M'].to_numpy()
             
             # Selecionando dados para exibição
             if view_type_product == "Acumulado 12M":
@@ -1133,10 +1429,15 @@ def main():
             # Criando gráfico
             fig_product = go.Figure()
             
+            # Mesmo teto de pontos do gráfico principal (LTTB em séries longas)
+            x_prod = product_data['Data'].to_numpy(dtype='datetime64[ms]')
+            y_prod = y_data.to_numpy(dtype=np.float32)
+            prod_idx = _lttb_indices(x_prod.astype(np.int64), y_prod, MAX_CHART_POINTS)
+            
             fig_product.add_trace(
-                go.Scatter(
-                    x=product_data['Data'], 
-                    y=y_data,
+                go.Scattergl(  # WebGL: redesenho mais leve no navegador
+                    x=x_prod[prod_idx], 
+                    y=y_prod[prod_idx],
                     name=trade_type,
                     line=dict(color=chart_color, width=3),
                     mode='lines',
@@ -1157,20 +1458,136 @@ def main():
             # Estatísticas do produto
             col1, col2, col3 = st.columns(3)
             with col1:
-                total_value = product_data['Value_12M'].iloc[-1] if not product_data.empty else 0
+                total_value = value_12m[-1]
                 st.metric(f"{trade_type} (12M)", f"US$ {total_value:.1f} Bi")
             
             with col2:
-                if len(product_data) > 12:
-                    yoy_growth = ((product_data['Value_12M'].iloc[-1] / product_data['Value_12M'].iloc[-13]) - 1) * 100 if product_data['Value_12M'].iloc[-13] > 0 else 0
+                if len(value_12m) > 12:
+                    yoy_growth = ((value_12m[-1] / value_12m[-13]) - 1) * 100 if value_12m[-13] > 0 else 0
                     st.metric("Crescimento (12M)", f"{yoy_growth:+.1f}%")
             
             with col3:
-                avg_monthly = product_data['VL_FOB_BI'].tail(12).mean()
+                avg_monthly = vl_bi[-12:].mean()
                 st.metric("Média Mensal (12M)", f"US$ {avg_monthly:.2f} Bi")
                 
         else:
             st.warning(f"Não há dados de {trade_type.lower()} para o produto selecionado.")
 
+# =============================================================================
+# FUNÇÃO PRINCIPAL DO DASHBOARD
+# =============================================================================
+
+def main():
+    """
+    Função principal que coordena todo o dashboard Streamlit
+    
+    Estrutura:
+    1. Carregamento e processamento dos dados
+    2. Interface de controles no sidebar
+    3. Gráfico principal interativo
+    4. Métricas de resumo
+    5. Tabela de produtos exportados
+    6. Simulador de cenários tarifários
+    7. Análise por produto específico
+    """
+    
+    # =============================================================================
+    # 1. CABEÇALHO E TÍTULO
+    # =============================================================================
+    
+    st.title("📊 Trade Balance Brasil-EUA")
+    st.markdown("### Análise Completa do Comércio Bilateral")
+    
+    # Explicação dos indicadores
+    with st.expander("ℹ️ Explicação dos Indicadores"):
+        st.markdown("""
+        **📈 Exportações/Importações**: Valor em milhões de USD (ex: 41.418 = 41 bilhões e 418 milhões)
+        
+        **⚖️ Trade Balance**: Diferença entre exportações e importações
+        - Positivo = Superávit (exportamos mais do que importamos)
+        - Negativo = Déficit (importamos mais do que exportamos)
+        
+        **🎯 Cobertura das Importações**: Quantas vezes as exportações "cobrem" as importações
+        - 0.95x = Exportações cobrem 95% das importações (déficit de 5%)
+        - 1.20x = Exportações cobrem 120% das importações (superávit de 20%)
+        - Valores > 1.0 = Superávit comercial
+        - Valores < 1.0 = Déficit comercial
+        """)
+    
+    st.markdown("---")
+    
+    # =============================================================================
+    # 2. CARREGAMENTO E PROCESSAMENTO DOS DADOS
+    # =============================================================================
+    
+    # Carregando dados
+    with st.spinner("Carregando dados..."):
+        export_data, import_data, data_source = load_data()
+        
+        if export_data is None or import_data is None:
+            st.error("❌ **Dados não disponíveis**")
+            st.warning("⚠️ Os arquivos CSV não foram encontrados e o GitHub Release ainda não foi criado.")
+            
+            st.info("📋 **Para resolver este problema:**")
+            st.markdown("""
+            1. **Acesse:** https://github.com/ealmeida11/dashboard-brasil-eua/releases
+            2. **Clique:** "Create a new release"
+            3. **Tag version:** `v1.0.0`
+            4. **Release title:** "Dados do Dashboard Brasil-EUA"
+            5. **Anexe os arquivos:**
+               - `dados_brasil_eua_exportacao.csv`
+               - `dados_brasil_eua_importacao.csv`
+            6. **Publish release**
+            
+            Após criar o release, o dashboard carregará automaticamente os dados!
+            """)
+            
+            st.info("💡 **Alternativa:** Faça upload manual dos arquivos CSV na pasta raiz do projeto.")
+            st.stop()
+        
+        # Mesmos arquivos e versão lidos por load_data (uma única chave para todos os caches)
+        export_path, import_path, data_version = data_source
+        trade_monthly = create_monthly_aggregation(export_path, import_path, data_version)
+    
+    # =============================================================================
+    # 3. GRÁFICO PRINCIPAL E MÉTRICAS DINÂMICAS
+    # =============================================================================
+    
+    # Gráfico e métricas em fragment: trocar a visualização não reexecuta a página
+    create_overview_section(trade_monthly, data_version)
+    
+    # =============================================================================
+    # 4. TABELA DE PRODUTOS
+    # =============================================================================
+    
+    st.subheader("📦 Principais Produtos Exportados (Top 10 + Outros)")
+    
+    product_table = create_product_table(data_version, export_data)
+    
+    # Formatando a tabela para exibição (formato brasileiro), de forma vetorizada
+    valor_mi = product_table['VL_FOB_MI'].round().astype('int64').astype(str)
+    display_table = pd.DataFrame({
+        'Produto': product_table['Produto'],
+        'Valor (US$ Mi)': valor_mi.str.replace(r'(\d)(?=(\d{3})+$)', r'\1.', regex=True),
+        'Participação (%)': np.char.mod('%.1f%%', product_table['Percentual'].to_numpy()),
+    })
+    
+    # Tabela estática de 11 linhas: st.table gera HTML direto, sem o grid interativo
+    st.table(display_table.set_index('Produto'))
+    
+    # =============================================================================
+    # 5. SIMULADOR DE TARIFAS COMPACTO
+    # =============================================================================
+    
+    # Tabela Top 100 montada fora do fragment (não é refeita a cada edição)
+    create_compact_tariff_simulator(export_data, create_top100_for_simulator(data_version, export_data), data_version)
+    
+    # =============================================================================
+    # 6. ANÁLISE POR PRODUTO ESPECÍFICO
+    # =============================================================================
+    
+    # Seção isolada em fragment: produto, tipo e visualização reexecutam só ela
+    create_product_analysis(export_data, import_data, data_version)
+
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -5,9 +5,37 @@ Script para extrair dados de comércio Brasil-EUA dos dados completos
 
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
 from datetime import datetime
 import os
 
+# Colunas lidas dos arquivos completos (as demais nunca são materializadas)
+COLUNAS_EXTRAIDAS = ['CO_ANO', 'CO_MES', 'CO_NCM', 'CO_PAIS', 'VL_FOB']
+
+# Códigos inteiros cabem em int32 (NCM tem 8 dígitos); VL_FOB segue em int64
+# para manter os valores exatos no CSV (o dashboard converte para float32 na carga)
+TIPOS_COLUNAS = {'CO_ANO': pa.int32(), 'CO_MES': pa.int32(), 'CO_NCM': pa.int32(), 'CO_PAIS': pa.int32()}
+
+# Tamanho do bloco lido por vez pelo leitor CSV do Arrow
+BLOCK_SIZE = 64 << 20
+
+def _abrir_csv(path):
+    """Leitor CSV em streaming (Arrow, multi-thread) apenas com as colunas usadas"""
+    return pa_csv.open_csv(
+        path,
+        read_options=pa_csv.ReadOptions(block_size=BLOCK_SIZE),
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=COLUNAS_EXTRAIDAS, column_types=TIPOS_COLUNAS
+        )
+    )
+
+def _primeiro_dia_do_mes(ano, mes):
+    """Datas do primeiro dia de cada (ano, mês), sem montar um DataFrame para o to_datetime"""
+    meses = (ano.to_numpy(dtype=np.int64) - 1970) * 12 + mes.to_numpy(dtype=np.int64) - 1
+    return meses.astype('datetime64[M]').astype('datetime64[ns]')
+
 def extrair_dados_brasil_eua():
     """
     Extrai dados de exportação e importação Brasil-EUA dos arquivos completos
@@ -34,44 +62,46 @@ def extrair_dados_brasil_eua():
         return
     
     # Identificando código dos EUA
-    eua_codigo = paises[paises['NO_PAIS'].str.contains('ESTADOS UNIDOS', case=False, na=False)]['CO_PAIS'].iloc[0]
+    eua = paises[paises['NO_PAIS'].str.contains('ESTADOS UNIDOS', case=False, na=False)].iloc[0]
+    eua_codigo, eua_nome = eua['CO_PAIS'], eua['NO_PAIS']
     print(f"🇺🇸 Código dos EUA identificado: {eua_codigo}")
     
+    # Dicionário NCM -> descrição, montado uma vez para as duas bases
+    ncm_map = dict(zip(ncm['CO_NCM'].values, ncm['NO_NCM_POR'].values))
+    
     # Processando EXPORTAÇÕES
     print("\n📤 Processando dados de EXPORTAÇÃO...")
     try:
-        export_chunks = []
-        chunk_size = 100000
+        reader = _abrir_csv('export_data/EXP_COMPLETA.csv')
+        eua_batches = []
         
-        for chunk_num, chunk in enumerate(pd.read_csv('export_data/EXP_COMPLETA.csv', chunksize=chunk_size)):
+        for chunk_num, batch in enumerate(reader):
             print(f"   Processando chunk {chunk_num + 1}...")
             
-            # Filtrar apenas EUA
-            eua_chunk = chunk[chunk['CO_PAIS'] == eua_codigo].copy()
-            
-            if not eua_chunk.empty:
-                # Criar coluna de data
-                eua_chunk = eua_chunk.assign(CO_DIA=1)
-                eua_chunk['Data'] = pd.to_datetime(eua_chunk[['CO_ANO', 'CO_MES', 'CO_DIA']])
-                
-                # Adicionar informações auxiliares
-                eua_chunk = eua_chunk.merge(paises[['CO_PAIS', 'NO_PAIS']], on='CO_PAIS', how='left')
-                eua_chunk = eua_chunk.merge(ncm[['CO_NCM', 'NO_NCM_POR']], on='CO_NCM', how='left')
-                
-                # Renomear colunas
-                eua_chunk = eua_chunk.rename(columns={
-                    'NO_PAIS': 'Pais',
-                    'NO_NCM_POR': 'Produto'
-                })
-                
-                # Adicionar tipo
-                eua_chunk['Tipo'] = 'Exportacao'
-                
-                export_chunks.append(eua_chunk)
+            # Filtrar apenas EUA no próprio Arrow: só as linhas dos EUA ficam em memória
+            eua_batches.append(batch.filter(pc.equal(batch.column('CO_PAIS'), int(eua_codigo))))
         
-        if export_chunks:
-            export_data = pd.concat(export_chunks, ignore_index=True)
+        # Uma única conversão para pandas, já sobre as linhas filtradas
+        export_data = pa.Table.from_batches(eua_batches, schema=reader.schema).to_pandas()
+        
+        if not export_data.empty:
+            # Criar coluna de data (dia 1 do mês) por aritmética de meses desde 1970
+            export_data['Data'] = _primeiro_dia_do_mes(export_data['CO_ANO'], export_data['CO_MES'])
+            
+            # Adicionar informações auxiliares (todas as linhas já são dos EUA)
+            export_data['Pais'] = eua_nome
+            export_data['Produto'] = export_data['CO_NCM'].map(ncm_map)
+            
+            # Adicionar tipo
+            export_data['Tipo'] = 'Exportacao'
+            
+            # Textos repetidos como categoria: o Parquet guarda o dicionário e o dashboard
+            # já recebe Produto/Pais codificados (no CSV nada muda)
+            export_data[['Pais', 'Produto']] = export_data[['Pais', 'Produto']].astype('category')
+            
             export_data.to_csv('dados_brasil_eua_exportacao.csv', index=False)
+            # Parquet (zstd) ao lado do CSV: o dashboard lê direto, sem parse de texto
+            export_data.to_parquet('dados_brasil_eua_exportacao.parquet', engine='pyarrow', compression='zstd', index=False)
             print(f"✅ Exportações salvas: {len(export_data):,} registros ({export_data['VL_FOB'].sum()/1000000:.1f} Mi USD)")
         else:
             print("❌ Nenhum dado de exportação encontrado para os EUA")
@@ -82,37 +112,36 @@ def extrair_dados_brasil_eua():
     # Processando IMPORTAÇÕES
     print("\n📥 Processando dados de IMPORTAÇÃO...")
     try:
-        import_chunks = []
+        reader = _abrir_csv('import_data/IMP_COMPLETA.csv')
+        eua_batches = []
         
-        for chunk_num, chunk in enumerate(pd.read_csv('import_data/IMP_COMPLETA.csv', chunksize=chunk_size)):
+        for chunk_num, batch in enumerate(reader):
             print(f"   Processando chunk {chunk_num + 1}...")
             
-            # Filtrar apenas EUA
-            eua_chunk = chunk[chunk['CO_PAIS'] == eua_codigo].copy()
-            
-            if not eua_chunk.empty:
-                # Criar coluna de data
-                eua_chunk = eua_chunk.assign(CO_DIA=1)
-                eua_chunk['Data'] = pd.to_datetime(eua_chunk[['CO_ANO', 'CO_MES', 'CO_DIA']])
-                
-                # Adicionar informações auxiliares
-                eua_chunk = eua_chunk.merge(paises[['CO_PAIS', 'NO_PAIS']], on='CO_PAIS', how='left')
-                eua_chunk = eua_chunk.merge(ncm[['CO_NCM', 'NO_NCM_POR']], on='CO_NCM', how='left')
-                
-                # Renomear colunas
-                eua_chunk = eua_chunk.rename(columns={
-                    'NO_PAIS': 'Pais',
-                    'NO_NCM_POR': 'Produto'
-                })
-                
-                # Adicionar tipo
-                eua_chunk['Tipo'] = 'Importacao'
-                
-                import_chunks.append(eua_chunk)
+            # Filtrar apenas EUA no próprio Arrow: só as linhas dos EUA ficam em memória
+            eua_batches.append(batch.filter(pc.equal(batch.column('CO_PAIS'), int(eua_codigo))))
+        
+        # Uma única conversão para pandas, já sobre as linhas filtradas
+        import_data = pa.Table.from_batches(eua_batches, schema=reader.schema).to_pandas()
         
-        if import_chunks:
-            import_data = pd.concat(import_chunks, ignore_index=True)
+        if not import_data.empty:
+            # Criar coluna de data (dia 1 do mês) por aritmética de meses desde 1970
+            import_data['Data'] = _primeiro_dia_do_mes(import_data['CO_ANO'], import_data['CO_MES'])
+            
+            # Adicionar informações auxiliares (todas as linhas já são dos EUA)
+            import_data['Pais'] = eua_nome
+            import_data['Produto'] = import_data['CO_NCM'].map(ncm_map)
+            
+            # Adicionar tipo
+            import_data['Tipo'] = 'Importacao'
+            
+            # Textos repetidos como categoria: o Parquet guarda o dicionário e o dashboard
+            # já recebe Produto/Pais codificados (no CSV nada muda)
+            import_data[['Pais', 'Produto']] = import_data[['Pais', 'Produto']].astype('category')
+            
             import_data.to_csv('dados_brasil_eua_importacao.csv', index=False)
+            # Parquet (zstd) ao lado do CSV: o dashboard lê direto, sem parse de texto
+            import_data.to_parquet('dados_brasil_eua_importacao.parquet', engine='pyarrow', compression='zstd', index=False)
             print(f"✅ Importações salvas: {len(import_data):,} registros ({import_data['VL_FOB'].sum()/1000000:.1f} Mi USD)")
         else:
             print("❌ Nenhum dado de importação encontrado para os EUA")
@@ -124,6 +153,8 @@ def extrair_dados_brasil_eua():
     print("📁 Arquivos gerados:")
     print("   - dados_brasil_eua_exportacao.csv")
     print("   - dados_brasil_eua_importacao.csv")
+    print("   - dados_brasil_eua_exportacao.parquet")
+    print("   - dados_brasil_eua_importacao.parquet")
 
 if __name__ == "__main__":
     # Verificar se arquivos existem